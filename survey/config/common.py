@@ -23,6 +23,7 @@ class Common(Configuration):
         'django.contrib.sessions',
         'django.contrib.messages',
         'django.contrib.staticfiles',
+        'django.contrib.postgres',
 
         'rest_framework',
         'rest_framework.authtoken',
@@ -54,6 +55,53 @@ class Common(Configuration):
         )
     }
 
+    # Rendered surveys are cached until they change or stop being active,
+    # but no longer than this many seconds
+    SURVEY_CACHE_TIMEOUT = env.int('SURVEY_CACHE_TIMEOUT', 60 * 60)
+    # A worker rebuilding a survey holds a lease for up to this many seconds,
+    # others serve the stale survey or wait for the rebuilt one this long
+    SURVEY_CACHE_LOCK_TIMEOUT = env.int('SURVEY_CACHE_LOCK_TIMEOUT', 10)
+    SURVEY_CACHE_LOCK_WAIT = env.float('SURVEY_CACHE_LOCK_WAIT', 0.5)
+
+    # Text search configuration used for full-text search over surveys
+    SURVEY_SEARCH_CONFIG = env.str('SURVEY_SEARCH_CONFIG', 'english')
+
+    # Survey response answers are stored either as nested responses in their
+    # own tables ('tables') or as a single JSONB document each ('jsonb')
+    SURVEY_RESPONSES_STORAGE = env.str('SURVEY_RESPONSES_STORAGE', 'tables')
+
+    # Max survey responses accepted by a single bulk submission
+    SURVEY_RESPONSES_BULK_LIMIT = env.int('SURVEY_RESPONSES_BULK_LIMIT', 1000)
+
+    # Submitted survey responses are queued and saved by the process_submissions
+    # worker; outcomes of processed submissions are kept this many seconds
+    SURVEY_RESPONSES_ASYNC = env.bool('SURVEY_RESPONSES_ASYNC', False)
+    SUBMISSION_RESULT_TIMEOUT = env.int('SUBMISSION_RESULT_TIMEOUT', 60 * 60 * 24)
+
+    # Survey responses submitted to the same worker process within the linger
+    # time (seconds) are saved together in one transaction, up to batch size;
+    # pays off with threaded workers, e.g. gunicorn --threads
+    SURVEY_RESPONSES_WRITE_BEHIND = env.bool('SURVEY_RESPONSES_WRITE_BEHIND', False)
+    SUBMISSION_BATCH_SIZE = env.int('SUBMISSION_BATCH_SIZE', 50)
+    SUBMISSION_BATCH_LINGER = env.float('SUBMISSION_BATCH_LINGER', 0.005)
+
+    # Responses to requests with an Idempotency-Key header are replayed to
+    # retries for this many seconds; a request being processed holds its key
+    # for no longer than the lock timeout
+    IDEMPOTENCY_KEY_TIMEOUT = env.int('IDEMPOTENCY_KEY_TIMEOUT', 60 * 60 * 24)
+    IDEMPOTENCY_KEY_LOCK_TIMEOUT = env.int('IDEMPOTENCY_KEY_LOCK_TIMEOUT', 60)
+
+    # Survey responses are exported through a server-side cursor, fetching
+    # this many rows at a time
+    SURVEY_EXPORT_CHUNK_SIZE = env.int('SURVEY_EXPORT_CHUNK_SIZE', 2000)
+
+    # Unpaginated lists are streamed, serializing this many objects at a time
+    LIST_STREAM_CHUNK_SIZE = env.int('LIST_STREAM_CHUNK_SIZE', 100)
+
+    # Cross-tabulation keeps selected response options of this many surveys
+    # in memory of each worker process
+    CROSSTAB_CACHE_SIZE = env.int('CROSSTAB_CACHE_SIZE', 4)
+
     # hide SECRET_KEY in .env file for production
     SECRET_KEY = env.str('DJANGO_SECRET_KEY', 'h1de-me')
 
@@ -178,6 +226,10 @@ class Common(Configuration):
         },
     }
 
+    # Paginated lists estimated to be larger than this many rows report
+    # the planner estimate as their count instead of running COUNT(*)
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD = env.int('PAGINATION_COUNT_ESTIMATE_THRESHOLD', 10000)
+
     REST_FRAMEWORK = {
         'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
         'PAGE_SIZE': env.int('DJANGO_PAGINATION_LIMIT', 10),
@@ -1,4 +1,4 @@
-from .common import Common
+from .common import Common, env
 
 
 class Production(Common):
@@ -11,6 +11,12 @@ class Production(Common):
     ALLOWED_HOSTS = ["*"]
     INSTALLED_APPS += ("gunicorn",)
 
+    # Cache has to be shared between gunicorn workers,
+    # otherwise survey cache invalidation stays local to a single worker
+    CACHES = {
+        'default': env.cache('DJANGO_CACHE_URL', default='memcache://127.0.0.1:11211'),
+    }
+
     # Static files (CSS, JavaScript, Images)
     # https://docs.djangoproject.com/en/2.0/howto/static-files/
     # http://django-storages.readthedocs.org/en/latest/index.html
@@ -0,0 +1 @@
+default_app_config = 'survey.surveys.apps.SurveysConfig'
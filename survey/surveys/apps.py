@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 
 class SurveysConfig(AppConfig):
-    name = 'surveys'
+    name = 'survey.surveys'
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,74 @@
+import threading
+from typing import List, Optional
+
+from django.conf import settings
+
+from .submissions import submit_survey_responses
+
+
+class _Submission:
+	def __init__(self, payload: dict) -> None:
+		self.payload = payload
+		self.result: Optional[dict] = None
+		self.error: Optional[Exception] = None
+		self.done = threading.Event()
+
+
+class _Batch:
+	def __init__(self) -> None:
+		self.submissions: List[_Submission] = []
+		self.full = threading.Event()
+
+
+class SubmissionBatcher:
+	"""
+	Write-behind of submissions within a worker process. The first thread
+	to submit opens a batch and holds it for SUBMISSION_BATCH_LINGER seconds
+	or until SUBMISSION_BATCH_SIZE submissions join it, then saves the whole
+	batch in one transaction. Every thread gets the outcome of its own
+	submission, as returned by submit_survey_responses.
+	"""
+
+	def __init__(self) -> None:
+		self._lock = threading.Lock()
+		self._batch: Optional[_Batch] = None
+
+	def submit(self, payload: dict) -> dict:
+		submission = _Submission(payload)
+		with self._lock:
+			if leader := self._batch is None:
+				self._batch = _Batch()
+			batch = self._batch
+			batch.submissions.append(submission)
+			if len(batch.submissions) >= settings.SUBMISSION_BATCH_SIZE:
+				batch.full.set()
+				self._batch = None
+
+		if leader:
+			batch.full.wait(settings.SUBMISSION_BATCH_LINGER)
+			with self._lock:
+				if self._batch is batch:
+					self._batch = None
+			self._save(batch.submissions)
+		else:
+			submission.done.wait()
+
+		if submission.error is not None:
+			raise submission.error
+		return submission.result
+
+	def _save(self, submissions: List[_Submission]) -> None:
+		try:
+			results = submit_survey_responses([submission.payload for submission in submissions])
+		except Exception as exc:
+			for submission in submissions:
+				submission.error = exc
+		else:
+			for submission, result in zip(submissions, results):
+				submission.result = result
+		finally:
+			for submission in submissions:
+				submission.done.set()
+
+
+batcher = SubmissionBatcher()
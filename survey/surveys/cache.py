@@ -0,0 +1,210 @@
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Type
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model, prefetch_related_objects
+from django.utils import timezone
+
+from .models import Survey, questions_prefetch
+from .schemas import SurveySchema, load_survey_schemas
+
+
+VERSION_KEY = 'survey:{pk}:version'
+REPRESENTATION_KEY = 'survey:{pk}:{version}:representation'
+STALE_KEY = 'survey:{pk}:stale'
+LOCK_KEY = 'survey:{pk}:{version}:lock'
+SCHEMA_KEY = 'survey:{pk}:{version}:schema'
+MODEL_VERSION_KEY = '{model}:version'
+COUNTER_KEY = 'survey-cache:{name}'
+
+HITS = 'hits'
+MISSES = 'misses'
+COALESCED = 'coalesced'
+COUNTERS = (HITS, MISSES, COALESCED)
+
+LOCK_POLL_INTERVAL = 0.05
+
+# cached in place of schemas of surveys that don't exist
+NO_SCHEMA = 'no schema'
+
+
+def _new_version() -> int:
+	"""
+	Versions start from a timestamp, so that an evicted counter never
+	resurrects a representation cached under an older version.
+	"""
+	return time.time_ns()
+
+
+def get_survey_versions(survey_pks: Iterable[int]) -> Dict[int, int]:
+	"""Returns current cache versions of the surveys keyed by survey pk."""
+	keys = {VERSION_KEY.format(pk=pk): pk for pk in survey_pks}
+	found = cache.get_many(keys)
+	versions = {keys[key]: version for key, version in found.items()}
+	for key in keys.keys() - found.keys():
+		cache.add(key, _new_version(), timeout=None)
+		versions[keys[key]] = cache.get(key)
+	return versions
+
+
+def bump_survey_version(survey_pk: int) -> None:
+	"""Invalidates every cached representation of the survey."""
+	_bump_version(VERSION_KEY.format(pk=survey_pk))
+
+
+def get_model_version(model: Type[Model]) -> int:
+	"""
+	Returns the current version of the model's rows, bumped whenever one
+	is saved or deleted, which tells apart lists that lost rows.
+	"""
+	key = MODEL_VERSION_KEY.format(model=model._meta.label_lower)
+	if (version := cache.get(key)) is None:
+		cache.add(key, _new_version(), timeout=None)
+		version = cache.get(key)
+	return version
+
+
+def bump_model_version(model: Type[Model]) -> None:
+	_bump_version(MODEL_VERSION_KEY.format(model=model._meta.label_lower))
+
+
+def _bump_version(key: str) -> None:
+	try:
+		cache.incr(key)
+	except ValueError:
+		cache.set(key, _new_version(), timeout=None)
+
+
+def get_cache_timeout(survey: Survey) -> int:
+	"""Seconds to keep the survey cached: no longer than it stays active."""
+	remaining = (survey.end_date - datetime.now(tz=timezone.utc)).total_seconds()
+	return int(min(settings.SURVEY_CACHE_TIMEOUT, remaining))
+
+
+def get_survey_schemas(survey_pks: Iterable[Optional[int]]) -> Dict[int, SurveySchema]:
+	"""
+	Returns compiled schemas of the surveys keyed by survey pk, skipping
+	surveys that don't exist, or None pks of deleted ones. Only schemas
+	missing from the cache are compiled; surveys found not to exist are
+	cached as such too.
+	"""
+	versions = get_survey_versions({pk for pk in survey_pks if pk is not None})
+	keys = {pk: SCHEMA_KEY.format(pk=pk, version=version) for pk, version in versions.items()}
+	found = cache.get_many(keys.values())
+	schemas = {pk: found[key] for pk, key in keys.items() if key in found}
+	if missing := keys.keys() - schemas.keys():
+		compiled = load_survey_schemas(missing)
+		cache.set_many(
+			{keys[pk]: compiled.get(pk, NO_SCHEMA) for pk in missing},
+			timeout=settings.SURVEY_CACHE_TIMEOUT,
+		)
+		schemas.update(compiled)
+	return {pk: schema for pk, schema in schemas.items() if schema != NO_SCHEMA}
+
+
+def _count(name: str, delta: int) -> None:
+	if not delta:
+		return
+	key = COUNTER_KEY.format(name=name)
+	try:
+		cache.incr(key, delta)
+	except ValueError:
+		cache.add(key, 0, timeout=None)
+		cache.incr(key, delta)
+
+
+def get_cache_stats() -> Dict[str, int]:
+	"""Returns hits, misses and coalesced rebuilds counted by all workers."""
+	found = cache.get_many([COUNTER_KEY.format(name=name) for name in COUNTERS])
+	return {name: found.get(COUNTER_KEY.format(name=name), 0) for name in COUNTERS}
+
+
+def get_survey_representations(surveys: List[Survey], serialize: Callable[[List[Survey]], List[dict]],
+							   stale: Optional[Set[int]] = None) -> List[dict]:
+	"""
+	Returns rendered representations of the surveys, in the same order.
+	Only surveys missing from the cache are prefetched and serialized.
+	Pks of surveys served in their previous version are added to stale.
+	"""
+	versions = get_survey_versions(survey.pk for survey in surveys)
+	keys = {
+		survey.pk: REPRESENTATION_KEY.format(pk=survey.pk, version=versions[survey.pk])
+		for survey in surveys
+	}
+	found = cache.get_many(keys.values())
+	missing = [survey for survey in surveys if keys[survey.pk] not in found]
+	_count(HITS, len(surveys) - len(missing))
+	_count(MISSES, len(missing))
+	if missing:
+		found.update(_rebuild(missing, keys, versions, serialize, stale))
+	return [found[keys[survey.pk]] for survey in surveys]
+
+
+def _rebuild(surveys: List[Survey], keys: Dict[int, str], versions: Dict[int, int],
+			 serialize: Callable[[List[Survey]], List[dict]],
+			 stale: Optional[Set[int]] = None) -> Dict[str, dict]:
+	"""
+	Single-flight rebuild. A worker takes a lease on every survey it is
+	going to serialize; surveys leased by other workers are served stale
+	or awaited for a short while instead of being serialized once more.
+	"""
+	lock_keys = {
+		survey.pk: LOCK_KEY.format(pk=survey.pk, version=versions[survey.pk])
+		for survey in surveys
+	}
+	leased = [
+		survey for survey in surveys
+		if cache.add(lock_keys[survey.pk], True, timeout=settings.SURVEY_CACHE_LOCK_TIMEOUT)
+	]
+	rendered = {}
+	contended = [survey for survey in surveys if survey not in leased]
+	if contended:
+		rendered.update(_await_rebuilt(contended, keys, stale))
+		_count(COALESCED, len(rendered))
+	to_serialize = [survey for survey in surveys if keys[survey.pk] not in rendered]
+	try:
+		if to_serialize:
+			rendered.update(_serialize(to_serialize, keys, serialize))
+	finally:
+		cache.delete_many([lock_keys[survey.pk] for survey in leased])
+	return rendered
+
+
+def _serialize(surveys: List[Survey], keys: Dict[int, str],
+			   serialize: Callable[[List[Survey]], List[dict]]) -> Dict[str, dict]:
+	"""Serializes the surveys and caches them as both fresh and stale."""
+	prefetch_related_objects(surveys, questions_prefetch())
+	rendered = {}
+	for survey, data in zip(surveys, serialize(surveys)):
+		rendered[keys[survey.pk]] = data
+		if (timeout := get_cache_timeout(survey)) > 0:
+			cache.set_many({
+				keys[survey.pk]: data,
+				STALE_KEY.format(pk=survey.pk): data,
+			}, timeout=timeout)
+	return rendered
+
+
+def _await_rebuilt(surveys: List[Survey], keys: Dict[int, str],
+				   stale: Optional[Set[int]] = None) -> Dict[str, dict]:
+	"""
+	Returns representations of surveys being rebuilt by other workers:
+	the previous version if there is one, otherwise the fresh one as soon
+	as it shows up, until SURVEY_CACHE_LOCK_WAIT runs out.
+	"""
+	previous = cache.get_many([STALE_KEY.format(pk=survey.pk) for survey in surveys])
+	rendered = {
+		keys[survey.pk]: previous[STALE_KEY.format(pk=survey.pk)]
+		for survey in surveys if STALE_KEY.format(pk=survey.pk) in previous
+	}
+	if stale is not None:
+		stale.update(survey.pk for survey in surveys if keys[survey.pk] in rendered)
+	waiting = [keys[survey.pk] for survey in surveys if keys[survey.pk] not in rendered]
+	deadline = time.monotonic() + settings.SURVEY_CACHE_LOCK_WAIT
+	while waiting and time.monotonic() < deadline:
+		time.sleep(LOCK_POLL_INTERVAL)
+		rendered.update(cache.get_many(waiting))
+		waiting = [key for key in waiting if key not in rendered]
+	return rendered
@@ -0,0 +1,189 @@
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import connections
+
+import numpy as np
+
+from .models import Question, Response, SurveyResponse, SurveyTally
+from .schemas import QuestionSchema, SurveySchema
+
+
+def _selections_sql() -> str:
+	"""
+	Response options of two questions selected in survey responses to a
+	survey after the given survey response id, from nested responses and
+	from JSONB answer documents alike, as two parallel arrays of survey
+	response ids and option ids. Arrays come as bytea of big-endian int4,
+	read by NumPy without making a Python object per value.
+	Along with them, in the same snapshot, come the survey tally and the
+	number and the last id of survey responses after the given one.
+	"""
+	response_select = Response.response_select.through._meta.db_table
+	responses = SurveyResponse.responses.through._meta.db_table
+	survey_responses = SurveyResponse._meta.db_table
+	return f'''
+		SELECT
+			(SELECT COALESCE(MAX(count), 0) FROM {SurveyTally._meta.db_table} WHERE survey_id = %(survey)s),
+			(SELECT COUNT(*) FROM {survey_responses} WHERE survey_id = %(survey)s AND id > %(after)s),
+			(SELECT MAX(id) FROM {survey_responses} WHERE survey_id = %(survey)s AND id > %(after)s),
+			string_agg(int4send(survey_response), ''),
+			string_agg(int4send(option), '')
+		FROM (
+			SELECT link.surveyresponse_id, selected.responseoption_id
+			FROM {response_select} selected
+			JOIN {responses} link ON link.response_id = selected.response_id
+			WHERE selected.responseoption_id = ANY(%(options)s) AND link.surveyresponse_id > %(after)s
+			UNION ALL
+			SELECT survey_response.id, option.value::int
+			FROM {survey_responses} survey_response
+			CROSS JOIN LATERAL (
+				VALUES (survey_response.answers -> %(q1)s), (survey_response.answers -> %(q2)s)
+			) AS answer (value)
+			CROSS JOIN LATERAL jsonb_array_elements(
+				CASE jsonb_typeof(answer.value) WHEN 'array' THEN answer.value END
+			) AS option
+			WHERE survey_response.survey_id = %(survey)s AND survey_response.id > %(after)s
+				AND survey_response.answers IS NOT NULL
+		) AS selections (survey_response, option)
+	'''
+
+
+class Selections(NamedTuple):
+	"""
+	Respondent × option one-hot matrix of survey questions: 1 where the
+	survey response selected the response option. Rows follow survey
+	response ids, columns follow response option ids, both ascending.
+	"""
+	survey_responses: np.ndarray
+	options: np.ndarray
+	matrix: np.ndarray
+
+	def columns(self, question: QuestionSchema) -> np.ndarray:
+		return np.searchsorted(self.options, sorted(question.options))
+
+
+class LoadedSelections(NamedTuple):
+	"""Selections along with what they cover, to load later survey responses only."""
+	selections: Selections
+	# the survey tally and the last survey response id as of loading
+	respondents: int
+	last_survey_response: int
+
+
+def load_selections(schema: SurveySchema, q1: int, q2: int,
+					loaded: Optional[LoadedSelections] = None) -> LoadedSelections:
+	"""
+	Loads response options of the two questions selected in survey
+	responses to the survey, in a single query. With selections loaded
+	before, only later survey responses are loaded and appended, unless
+	that doesn't add up to the survey tally: survey responses were deleted,
+	or committed out of id order, and everything is loaded again.
+	"""
+	options = np.array(sorted({*schema.questions[q1].options, *schema.questions[q2].options}), dtype=np.int64)
+	after = loaded.last_survey_response if loaded is not None else 0
+	with connections[SurveyResponse.objects.db].cursor() as cursor:
+		cursor.execute(_selections_sql(), {
+			'survey': schema.pk,
+			'q1': str(q1),
+			'q2': str(q2),
+			'options': options.tolist(),
+			'after': after,
+		})
+		respondents, added, last_survey_response, *columns = cursor.fetchone()
+	if loaded is not None and loaded.respondents + added != respondents:
+		return load_selections(schema, q1, q2)
+	survey_responses, selected = (np.frombuffer(column or b'', dtype='>i4').astype(np.int64) for column in columns)
+	# skips options since removed from the questions
+	known = np.isin(selected, options)
+	survey_responses, rows = np.unique(survey_responses[known], return_inverse=True)
+	matrix = np.zeros((len(survey_responses), len(options)), dtype=np.uint8)
+	matrix[rows, np.searchsorted(options, selected[known])] = 1
+	selections = Selections(survey_responses, options, matrix)
+	if loaded is not None and not len(survey_responses):
+		selections = loaded.selections
+	elif loaded is not None:
+		# later survey responses have greater ids, rows stay in order
+		selections = Selections(
+			np.concatenate([loaded.selections.survey_responses, survey_responses]),
+			options,
+			np.concatenate([loaded.selections.matrix, matrix]),
+		)
+	return LoadedSelections(selections, respondents, last_survey_response or after)
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_selections(schema: SurveySchema, q1: int, q2: int) -> Selections:
+	"""
+	Selections of the two survey questions, kept in this process for the
+	CROSSTAB_CACHE_SIZE most recently used pairs of questions. New survey
+	responses are loaded on top of them; they are loaded anew once the
+	questions change.
+	"""
+	key = (schema.pk, q1, q2, tuple(sorted(schema.questions[q1].options)), tuple(sorted(schema.questions[q2].options)))
+	with _cache_lock:
+		loaded = _cache.get(key)
+	updated = load_selections(schema, q1, q2, loaded)
+	with _cache_lock:
+		# keeps what a concurrent request loaded meanwhile, if anything
+		if _cache.get(key) is loaded:
+			_cache[key] = updated
+		if key in _cache:
+			_cache.move_to_end(key)
+		while len(_cache) > settings.CROSSTAB_CACHE_SIZE:
+			_cache.popitem(last=False)
+	return updated.selections
+
+
+def crosstab(schema: SurveySchema, q1: int, q2: int) -> dict:
+	"""
+	Contingency table of two select [multiple] questions: how many
+	respondents selected each pair of their response options, along with
+	row and column percentages. Only respondents who answered both
+	questions are counted; with select multiple questions a respondent
+	counts towards every pair of the options they selected.
+	"""
+	row_question, column_question = schema.questions[q1], schema.questions[q2]
+	selections = get_selections(schema, q1, q2)
+	rows = selections.matrix[:, selections.columns(row_question)]
+	columns = selections.matrix[:, selections.columns(column_question)]
+	answered = rows.any(axis=1) & columns.any(axis=1)
+	rows, columns = rows[answered].astype(np.float64), columns[answered].astype(np.float64)
+	# both are one-hot, so the product counts respondents per pair of options
+	counts = (rows.T @ columns).astype(np.int64)
+	row_totals = rows.sum(axis=0).astype(np.int64)
+	column_totals = columns.sum(axis=0).astype(np.int64)
+	return {
+		'survey': schema.pk,
+		'respondents': int(answered.sum()),
+		'rows': _header(row_question),
+		'columns': _header(column_question),
+		'counts': counts.tolist(),
+		'row_totals': row_totals.tolist(),
+		'column_totals': column_totals.tolist(),
+		'row_percentages': _percentages(counts, row_totals[:, np.newaxis]),
+		'column_percentages': _percentages(counts, column_totals[np.newaxis, :]),
+	}
+
+
+def is_select_question(question: QuestionSchema) -> bool:
+	return question.question_type in (Question.SELECT, Question.SELECT_MULTIPLE)
+
+
+def _header(question: QuestionSchema) -> dict:
+	return {
+		'question': question.pk,
+		'title': question.title,
+		'options': [{'option': pk, 'title': question.options[pk]} for pk in sorted(question.options)],
+	}
+
+
+def _percentages(counts: np.ndarray, totals: np.ndarray) -> List[List[float]]:
+	with np.errstate(divide='ignore', invalid='ignore'):
+		percentages = np.where(totals > 0, counts * 100 / totals, 0)
+	return np.round(percentages, 2).tolist()
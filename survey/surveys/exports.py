@@ -0,0 +1,97 @@
+import csv
+import json
+from typing import Iterator, List, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+from .models import Response, SurveyResponse
+from .schemas import SurveySchema, render_answers
+
+
+def _answers_sql(counted: bool = False) -> str:
+	"""
+	Survey responses of a survey, ordered by pk, each with its answers
+	document: the stored one in the JSONB storage mode, otherwise
+	assembled from nested responses the way answers_document does.
+	"""
+	count = ', COUNT(*) OVER ()' if counted else ''
+	response_select = Response.response_select.through._meta
+	responses = SurveyResponse.responses.through._meta
+	return f'''
+		SELECT survey_response.id, survey_response.user_id, COALESCE(survey_response.answers, (
+			SELECT jsonb_object_agg(response.question_id, COALESCE(
+				(
+					SELECT jsonb_agg(selected.responseoption_id ORDER BY selected.responseoption_id)
+					FROM {response_select.db_table} selected
+					WHERE selected.response_id = response.id
+				),
+				to_jsonb(response.response_text)
+			))
+			FROM {responses.db_table} link
+			JOIN {Response._meta.db_table} response ON response.id = link.response_id
+			WHERE link.surveyresponse_id = survey_response.id AND response.question_id IS NOT NULL
+		), '{{}}'){count}
+		FROM {SurveyResponse._meta.db_table} survey_response
+		WHERE survey_response.survey_id = %s
+		ORDER BY survey_response.id
+	'''
+
+
+def iter_answer_chunks(survey_pk: int, counted: bool = False) -> Iterator[List[tuple]]:
+	"""
+	Yields (pk, user_id, answers) of every survey response to the survey,
+	in lists of SURVEY_EXPORT_CHUNK_SIZE rows fetched through a server-side
+	cursor, so that memory use doesn't depend on the number of rows.
+	Counted rows also end with the number of all of them, at the cost of
+	the database going through all rows before sending the first one.
+	"""
+	connection = connections[SurveyResponse.objects.db]
+	with connection.chunked_cursor() as cursor:
+		cursor.execute(_answers_sql(counted), [survey_pk])
+		while rows := cursor.fetchmany(settings.SURVEY_EXPORT_CHUNK_SIZE):
+			yield rows
+
+
+def iter_answers(survey_pk: int) -> Iterator[Tuple[int, str, dict]]:
+	"""Yields (pk, user_id, answers) of every survey response to the survey, see iter_answer_chunks."""
+	for rows in iter_answer_chunks(survey_pk):
+		yield from rows
+
+
+class _Echo:
+	"""File-like object handing written lines back to the csv writer."""
+
+	def write(self, value: str) -> str:
+		return value
+
+
+def export_csv(schema: SurveySchema) -> Iterator[str]:
+	"""
+	CSV lines, a header and a row per survey response: pk, user_id and
+	a column per question holding the text answer or titles of the
+	selected response options, joined by '; '.
+	"""
+	writer = csv.writer(_Echo())
+	questions = list(schema.questions.values())
+	yield writer.writerow(['pk', 'user_id', *(question.title for question in questions)])
+	for pk, user_id, answers in iter_answers(schema.pk):
+		row = [pk, user_id]
+		for question in questions:
+			answer = answers.get(str(question.pk), '')
+			if isinstance(answer, list):
+				answer = '; '.join(question.options[option] for option in answer if option in question.options)
+			row.append(answer)
+		yield writer.writerow(row)
+
+
+def export_ndjson(schema: SurveySchema) -> Iterator[str]:
+	"""A JSON line per survey response, as served by /api/v1/survey-responses/."""
+	for pk, user_id, answers in iter_answers(schema.pk):
+		survey_response = {
+			'pk': pk,
+			'user_id': user_id,
+			'survey': schema.pk,
+			'responses': render_answers(answers, schema),
+		}
+		yield json.dumps(survey_response) + '\n'
@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+
+import django_filters
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .models import Response, SurveyResponse
+
+
+class ForeignKeyOrderingFilter(OrderingFilter):
+	"""
+	Orders by foreign key columns themselves instead of the related model's
+	Meta.ordering, which takes a join and a sort of the whole table. Ties are
+	broken by the primary key, in the direction of the last field, so that
+	pages of rows sharing a value don't overlap or skip rows.
+	"""
+
+	def get_ordering(self, request, queryset, view):
+		ordering = super().get_ordering(request, queryset, view)
+		if not ordering:
+			return ordering
+		ordering = [self._get_column_ordering(queryset.model, field) for field in ordering]
+		pk_names = {'pk', queryset.model._meta.pk.attname}
+		if not any(field.lstrip('-') in pk_names for field in ordering):
+			ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+		return ordering
+
+	@staticmethod
+	def _get_column_ordering(model, field: str) -> str:
+		descending = field.startswith('-')
+		try:
+			model_field = model._meta.get_field(field.lstrip('-'))
+		except FieldDoesNotExist:
+			return field
+		if not model_field.many_to_one:
+			return field
+		return f'-{model_field.attname}' if descending else model_field.attname
+
+
+class SurveySearchFilter(BaseFilterBackend):
+	"""
+	Full-text search over survey titles and descriptions with `?search=`,
+	most relevant surveys first.
+	"""
+	search_param = 'search'
+
+	def filter_queryset(self, request, queryset, view):
+		text = request.query_params.get(self.search_param, '').strip()
+		if not text:
+			return queryset
+		return queryset.search(text)
+
+	def get_schema_operation_parameters(self, view):
+		return [
+			{
+				'name': self.search_param,
+				'required': False,
+				'in': 'query',
+				'description': 'Full-text search over titles and descriptions.',
+				'schema': {'type': 'string'},
+			},
+		]
+
+
+class ResponseFilter(django_filters.FilterSet):
+	"""
+	Case-insensitive search for a phrase in text answers, optionally scoped
+	to a survey or a question. Backed by a trigram index on response_text,
+	which needs at least three characters to narrow anything down.
+
+	Answers kept as JSONB documents have no responses to search, so search
+	is refused in the JSONB storage mode rather than missing them.
+	"""
+	search = django_filters.CharFilter(
+		field_name='response_text',
+		method='filter_search',
+		min_length=3,
+	)
+	survey = django_filters.NumberFilter(field_name='question__survey')
+
+	class Meta:
+		model = Response
+		fields = ['search', 'survey', 'question']
+
+	def filter_search(self, queryset, name, value):
+		if settings.SURVEY_RESPONSES_STORAGE == SurveyResponse.JSONB:
+			raise ValidationError({'search': ['Text answers are not searchable in the JSONB storage mode']})
+		return queryset.filter(**{f'{name}__icontains': value})
@@ -0,0 +1,85 @@
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADERS = ('Location',)
+
+
+def idempotent(view_method):
+	"""
+	Stores the response to a request sent with an Idempotency-Key header
+	and replays it to retries of the request. Keys are scoped to the method
+	and path, and to the user_id cookie of the caller if any; a key reused
+	with another request body gets 422 Unprocessable Entity. Retries sent
+	while the request is still processed get 409 Conflict. Server errors
+	aren't stored, so that the request may be retried.
+	"""
+	@wraps(view_method)
+	def wrapper(self, request, *args, **kwargs):
+		if (key := request.headers.get(HEADER)) is None:
+			return view_method(self, request, *args, **kwargs)
+		if not key or len(key) > MAX_KEY_LENGTH:
+			raise ValidationError({HEADER: [f'Provide a key of 1 to {MAX_KEY_LENGTH} characters']})
+		key = scope_key(request, key)
+		request_hash = hashlib.sha256(request.body).hexdigest()
+
+		if (stored := IdempotencyKey.objects.live().filter(key=key).first()) is not None:
+			return _replay(stored, request_hash)
+		if not IdempotencyKey.objects.reserve(key, request_hash, settings.IDEMPOTENCY_KEY_LOCK_TIMEOUT):
+			return _replay(IdempotencyKey.objects.live().filter(key=key).first(), request_hash)
+
+		try:
+			try:
+				response = view_method(self, request, *args, **kwargs)
+			except APIException as exc:
+				response = self.handle_exception(exc)
+		except Exception:
+			IdempotencyKey.objects.filter(key=key).delete()
+			raise
+		if response.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+			IdempotencyKey.objects.filter(key=key).delete()
+			return response
+		IdempotencyKey.objects.filter(key=key).update(
+			status_code=response.status_code,
+			body=response.data,
+			cookies={name: morsel.value for name, morsel in response.cookies.items()},
+			headers={name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)},
+			expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TIMEOUT),
+		)
+		return response
+	return wrapper
+
+
+def scope_key(request, key: str) -> str:
+	"""Key stored for the Idempotency-Key header of the request."""
+	scope = '\n'.join((request.method, request.path, request.COOKIES.get('user_id', ''), key))
+	return hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _replay(stored: IdempotencyKey, request_hash: str) -> Response:
+	if stored is not None and stored.request_hash != request_hash:
+		return Response(
+			{'detail': f'This {HEADER} was already used with another request body.'},
+			status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+		)
+	if stored is None or stored.status_code is None:
+		return Response(
+			{'detail': f'A request with this {HEADER} is being processed, retry later.'},
+			status=status.HTTP_409_CONFLICT,
+		)
+	response = Response(stored.body, status=stored.status_code, headers=stored.headers)
+	for name, value in stored.cookies.items():
+		response.set_cookie(name, value)
+	return response
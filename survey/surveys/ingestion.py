@@ -0,0 +1,80 @@
+from datetime import timedelta
+from typing import Dict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from rest_framework import status
+
+from .models import QueuedSubmission
+from .submissions import submit_survey_responses
+
+
+THROUGHPUT_WINDOW = timedelta(minutes=1)
+
+
+def enqueue_submission(payload: dict) -> QueuedSubmission:
+	"""Queues a survey response validated against its survey schema."""
+	return QueuedSubmission.objects.create(payload=payload)
+
+
+def drain_submissions(batch_size: int) -> int:
+	"""
+	Saves a batch of queued submissions in one transaction and records
+	their outcomes. Submissions locked by other workers are skipped, so
+	that workers may run side by side. A submission the database refuses
+	is marked failed without holding back the rest of the batch. Returns
+	the number processed.
+	"""
+	with transaction.atomic():
+		batch = list(
+			QueuedSubmission.objects
+			.filter(status=QueuedSubmission.PENDING)
+			.order_by('id')
+			.select_for_update(skip_locked=True)[:batch_size]
+		)
+		if not batch:
+			return 0
+		results = submit_survey_responses([submission.payload for submission in batch])
+		processed_at = timezone.now()
+		for submission, result in zip(batch, results):
+			if result['status'] == status.HTTP_201_CREATED:
+				submission.status = QueuedSubmission.CREATED
+				submission.result = {'pk': result['pk']}
+			elif result['status'] == status.HTTP_400_BAD_REQUEST:
+				submission.status = QueuedSubmission.REJECTED
+				submission.result = {'errors': result['errors']}
+			else:
+				submission.status = QueuedSubmission.FAILED
+				submission.result = {'errors': result['errors']}
+			submission.processed_at = processed_at
+		QueuedSubmission.objects.bulk_update(batch, ['status', 'result', 'processed_at'])
+	return len(batch)
+
+
+def purge_processed_submissions() -> int:
+	"""Deletes outcomes kept longer than SUBMISSION_RESULT_TIMEOUT."""
+	expired = timezone.now() - timedelta(seconds=settings.SUBMISSION_RESULT_TIMEOUT)
+	deleted, _ = QueuedSubmission.objects.filter(processed_at__lt=expired).delete()
+	return deleted
+
+
+def get_queue_stats() -> Dict[str, float]:
+	"""
+	Returns the number of pending submissions, seconds the oldest of them
+	has been waiting and submissions processed per second over the last minute.
+	"""
+	now = timezone.now()
+	pending = (
+		QueuedSubmission.objects
+		.filter(status=QueuedSubmission.PENDING)
+		.aggregate(depth=Count('pk'), oldest=Min('created_at'))
+	)
+	processed = QueuedSubmission.objects.filter(processed_at__gte=now - THROUGHPUT_WINDOW).count()
+	return {
+		'depth': pending['depth'],
+		'lag': (now - pending['oldest']).total_seconds() if pending['oldest'] else 0.0,
+		'throughput': processed / THROUGHPUT_WINDOW.total_seconds(),
+	}
@@ -0,0 +1,68 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from survey.surveys.models import Survey
+from survey.surveys.results import save_results
+
+
+class Command(BaseCommand):
+	help = (
+		'Computes results of surveys from their survey responses, in parallel '
+		'worker processes, into the survey results table or JSON files.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('surveys', nargs='*', type=int, help='Survey ids, all surveys by default.')
+		parser.add_argument(
+			'--workers',
+			type=int,
+			default=os.cpu_count(),
+			help='Number of worker processes, each with its own database connection. Defaults to the CPU count.',
+		)
+		parser.add_argument(
+			'--chunk-size',
+			type=int,
+			default=50,
+			help='Number of surveys a worker computes at once.',
+		)
+		parser.add_argument(
+			'--output-dir',
+			help='Write results into <survey id>.json files in this directory instead of the database.',
+		)
+
+	def handle(self, *args, **options):
+		if options['workers'] < 1 or options['chunk_size'] < 1:
+			raise CommandError('--workers and --chunk-size should be positive')
+		if (output_dir := options['output_dir']) is not None:
+			os.makedirs(output_dir, exist_ok=True)
+		survey_pks = options['surveys'] or list(Survey.objects.order_by('pk').values_list('pk', flat=True))
+		chunk_size = options['chunk_size']
+		chunks = [(survey_pks[start:start + chunk_size], output_dir) for start in range(0, len(survey_pks), chunk_size)]
+
+		started = time.monotonic()
+		computed = 0
+		for count in self.compute(chunks, options['workers']):
+			computed += count
+			self.stdout.write(f'Computed {computed}/{len(survey_pks)} surveys in {time.monotonic() - started:.2f}s')
+		self.stdout.write(self.style.SUCCESS(
+			f'Computed results of {computed} surveys with {options["workers"]} workers '
+			f'in {time.monotonic() - started:.2f}s',
+		))
+
+	def compute(self, chunks, workers):
+		"""Yields numbers of surveys computed, chunk by chunk, as they complete."""
+		if workers == 1:
+			yield from (save_results(*chunk) for chunk in chunks)
+			return
+		# forked workers must not share the connection of this process
+		connections.close_all()
+		with multiprocessing.get_context('fork').Pool(workers, initializer=connections.close_all) as pool:
+			yield from pool.imap_unordered(_save_results, chunks)
+
+
+def _save_results(chunk) -> int:
+	return save_results(*chunk)
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from survey.surveys.models import Response, SurveyResponse
+
+
+class Command(BaseCommand):
+	help = (
+		'Moves answers of survey responses from nested response tables into '
+		'JSONB documents, for the JSONB storage mode. Responses to deleted '
+		'questions are dropped. Converted text answers no longer show up in '
+		'the responses search.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--batch-size',
+			type=int,
+			default=1000,
+			help='Number of survey responses converted in one transaction.',
+		)
+
+	def handle(self, *args, **options):
+		pending = SurveyResponse.objects.filter(answers__isnull=True).order_by('pk')
+		converted = 0
+		while batch_pks := list(pending.values_list('pk', flat=True)[:options['batch_size']]):
+			with transaction.atomic():
+				self.convert(SurveyResponse.objects.filter(pk__in=batch_pks).with_responses())
+			converted += len(batch_pks)
+		self.stdout.write(self.style.SUCCESS(f'Converted {converted} survey responses'))
+
+	def convert(self, survey_responses) -> None:
+		survey_responses = list(survey_responses)
+		for survey_response in survey_responses:
+			survey_response.answers = {
+				str(response.question_id): (
+					[option.pk for option in response.response_select.all()] or response.response_text
+				)
+				for response in survey_response.responses.all() if response.question_id is not None
+			}
+		SurveyResponse.objects.bulk_update(survey_responses, ['answers'])
+		Response.objects.filter(survey_responses__in=survey_responses).delete()
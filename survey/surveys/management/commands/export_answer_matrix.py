@@ -0,0 +1,34 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from survey.surveys.matrices import write_answer_matrix
+from survey.surveys.schemas import load_survey_schemas
+
+
+class Command(BaseCommand):
+	help = (
+		'Writes answers of a survey as a respondent x option one-hot matrix '
+		'into .npy files, along with survey response, question and response '
+		'option ids. Open them with survey.surveys.matrices.load_answer_matrix.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('survey', type=int, help='Survey id.')
+		parser.add_argument(
+			'--output-dir',
+			help='Directory to write the .npy files into, survey-<survey id> by default.',
+		)
+
+	def handle(self, *args, **options):
+		if (schema := load_survey_schemas([options['survey']]).get(options['survey'])) is None:
+			raise CommandError(f'Survey {options["survey"]} does not exist')
+		directory = options['output_dir'] or f'survey-{schema.pk}'
+		os.makedirs(directory, exist_ok=True)
+		started = time.monotonic()
+		written = write_answer_matrix(schema, directory)
+		self.stdout.write(self.style.SUCCESS(
+			f'Wrote {written} survey responses x {len(schema.option_questions)} response options '
+			f'into {directory} in {time.monotonic() - started:.2f}s',
+		))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from survey.surveys.ingestion import drain_submissions, purge_processed_submissions
+
+
+class Command(BaseCommand):
+	help = 'Saves survey responses queued by the asynchronous submission mode.'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--batch-size',
+			type=int,
+			default=500,
+			help='Number of submissions saved in one transaction.',
+		)
+		parser.add_argument(
+			'--sleep',
+			type=float,
+			default=1.0,
+			help='Seconds to wait for new submissions once the queue is drained.',
+		)
+		parser.add_argument(
+			'--once',
+			action='store_true',
+			help='Exit once the queue is drained.',
+		)
+
+	def handle(self, *args, **options):
+		while True:
+			started = time.monotonic()
+			if processed := drain_submissions(options['batch_size']):
+				elapsed = time.monotonic() - started
+				self.stdout.write(
+					f'Processed {processed} submissions in {elapsed:.2f}s ({processed / elapsed:.0f}/s)'
+				)
+				continue
+			if purged := purge_processed_submissions():
+				self.stdout.write(f'Purged {purged} processed submissions')
+			if options['once']:
+				return
+			time.sleep(options['sleep'])
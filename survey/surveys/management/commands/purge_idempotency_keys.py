@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from survey.surveys.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+	help = 'Deletes expired idempotency keys along with their stored responses.'
+
+	def handle(self, *args, **options):
+		deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+		self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
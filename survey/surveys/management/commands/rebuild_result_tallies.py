@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from survey.surveys.models import Survey
+from survey.surveys.results import rebuild_tallies
+from survey.surveys.schemas import load_survey_schemas
+
+
+class Command(BaseCommand):
+	help = (
+		'Recounts result tallies of surveys from their survey responses and '
+		'fixes the ones gone wrong. With --verify, only reports them.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('surveys', nargs='*', type=int, help='Survey ids, all surveys by default.')
+		parser.add_argument(
+			'--verify',
+			action='store_true',
+			help='Leave the tallies as they are and fail if any is wrong.',
+		)
+		parser.add_argument(
+			'--batch-size',
+			type=int,
+			default=100,
+			help='Number of survey schemas loaded at once.',
+		)
+
+	def handle(self, *args, **options):
+		survey_pks = options['surveys'] or list(Survey.objects.order_by('pk').values_list('pk', flat=True))
+		batch_size = options['batch_size']
+		inconsistent = []
+		for start in range(0, len(survey_pks), batch_size):
+			schemas = load_survey_schemas(survey_pks[start:start + batch_size])
+			inconsistent.extend(
+				pk for pk, schema in schemas.items() if not rebuild_tallies(schema, verify=options['verify'])
+			)
+		if options['verify'] and inconsistent:
+			raise CommandError(f'Wrong result tallies of surveys {", ".join(map(str, inconsistent))}')
+		action = 'Verified' if options['verify'] else 'Rebuilt'
+		self.stdout.write(self.style.SUCCESS(
+			f'{action} result tallies of {len(survey_pks)} surveys, {len(inconsistent)} were wrong',
+		))
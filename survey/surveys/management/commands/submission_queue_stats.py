@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from survey.surveys.ingestion import get_queue_stats
+
+
+class Command(BaseCommand):
+	help = 'Prints submission queue depth, lag in seconds and drain throughput per second.'
+
+	def handle(self, *args, **options):
+		for name, value in get_queue_stats().items():
+			self.stdout.write(f'{name}: {value:g}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from survey.surveys.cache import get_cache_stats
+
+
+class Command(BaseCommand):
+	help = 'Prints survey cache hits, misses and coalesced rebuilds.'
+
+	def handle(self, *args, **options):
+		for name, value in get_cache_stats().items():
+			self.stdout.write(f'{name}: {value}')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from survey.surveys.cache import get_cache_stats, get_survey_representations
+from survey.surveys.models import Survey
+from survey.surveys.serializers import SurveySerializer
+
+
+class Command(BaseCommand):
+	help = 'Pre-renders every active survey into the survey cache.'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--batch-size',
+			type=int,
+			default=100,
+			help='Number of surveys rendered at once.',
+		)
+
+	def handle(self, *args, **options):
+		batch_size = options['batch_size']
+		surveys = Survey.objects.get_active_surveys().order_by('pk')
+		warmed = 0
+		for start in range(0, surveys.count(), batch_size):
+			batch = list(surveys[start:start + batch_size])
+			get_survey_representations(
+				batch,
+				lambda missing: SurveySerializer(missing, many=True).data,
+			)
+			warmed += len(batch)
+		stats = ', '.join(f'{name}: {value}' for name, value in get_cache_stats().items())
+		self.stdout.write(self.style.SUCCESS(f'Warmed {warmed} surveys ({stats})'))
@@ -0,0 +1,96 @@
+import itertools
+import os
+import zipfile
+from typing import IO, NamedTuple
+
+import numpy as np
+
+from .exports import iter_answer_chunks
+from .schemas import SurveySchema
+
+
+MATRIX = 'matrix.npy'
+RESPONDENTS = 'respondents.npy'
+QUESTIONS = 'questions.npy'
+OPTIONS = 'options.npy'
+
+
+class AnswerMatrix(NamedTuple):
+	"""
+	Answers of a survey as a respondent × option one-hot matrix, 1 where
+	the survey response selected the response option, along with ids of
+	survey responses for its rows and ids of response options and their
+	questions for its columns.
+	"""
+	matrix: np.ndarray
+	respondents: np.ndarray
+	questions: np.ndarray
+	options: np.ndarray
+
+
+def write_answer_matrix(schema: SurveySchema, directory: str) -> int:
+	"""
+	Writes the answer matrix of the survey into .npy files in the
+	directory. Survey responses are streamed from the database straight
+	into memory-mapped files, so memory use doesn't depend on their number.
+	Returns the number of survey responses written.
+	"""
+	options = np.array(sorted(schema.option_questions), dtype=np.int64)
+	np.save(os.path.join(directory, OPTIONS), options)
+	np.save(os.path.join(directory, QUESTIONS), np.array(
+		[schema.option_questions[pk] for pk in options.tolist()], dtype=np.int64,
+	))
+	columns = {pk: column for column, pk in enumerate(options.tolist())}
+
+	chunks = iter_answer_chunks(schema.pk, counted=True)
+	first = next(chunks, None)
+	total = first[0][-1] if first else 0
+	matrix = _open_memmap(os.path.join(directory, MATRIX), np.uint8, (total, len(options)))
+	respondents = _open_memmap(os.path.join(directory, RESPONDENTS), np.int64, (total,))
+	written = 0
+	for rows in itertools.chain([first] if first else [], chunks):
+		selected_rows, selected_columns = [], []
+		for row, (_, _, answers, _) in enumerate(rows, start=written):
+			for answer in answers.values():
+				if isinstance(answer, list):
+					selected = [columns[option] for option in answer if option in columns]
+					selected_rows.extend([row] * len(selected))
+					selected_columns.extend(selected)
+		matrix[selected_rows, selected_columns] = 1
+		respondents[written:written + len(rows)] = [row[0] for row in rows]
+		written += len(rows)
+
+	for array in (matrix, respondents):
+		if isinstance(array, np.memmap):
+			array.flush()
+	return written
+
+
+def _open_memmap(path: str, dtype, shape) -> np.ndarray:
+	"""Creates a .npy file memory-mapped for writing, unless it's empty: mmap can't map nothing."""
+	if np.prod(shape):
+		return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+	array = np.zeros(shape, dtype=dtype)
+	np.save(path, array)
+	return array
+
+
+def load_answer_matrix(directory: str) -> AnswerMatrix:
+	"""
+	Opens an answer matrix written by write_answer_matrix as read-only
+	memory maps: rows are read from disk as they are accessed.
+	"""
+	return AnswerMatrix(*(
+		np.load(os.path.join(directory, name), mmap_mode='r')
+		for name in (MATRIX, RESPONDENTS, QUESTIONS, OPTIONS)
+	))
+
+
+def pack_answer_matrix(directory: str, file: IO[bytes]) -> None:
+	"""
+	Archives the .npy files of an answer matrix into an uncompressed zip,
+	which np.load opens as well. Files are copied in blocks.
+	"""
+	with zipfile.ZipFile(file, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+		for name in (MATRIX, RESPONDENTS, QUESTIONS, OPTIONS):
+			archive.write(os.path.join(directory, name), name)
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.20 on 2026-10-18 16:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['survey', 'id'], name='question_survey_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['end_date'], name='survey_end_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['start_date', 'title'], name='survey_start_date_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyresponse',
+            index=models.Index(fields=['user_id', 'survey'], name='surveyresponse_user_survey_idx'),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='survey',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='questions', to='surveys.Survey'),
+        ),
+        migrations.AlterField(
+            model_name='survey',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='survey',
+            name='title',
+            field=models.CharField(max_length=300),
+        ),
+    ]
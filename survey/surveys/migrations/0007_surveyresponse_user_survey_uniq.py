@@ -0,0 +1,41 @@
+# Generated by Django 2.2.20 on 2026-10-18 16:50
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_repeated_survey_responses(apps, schema_editor):
+    """Keeps only the first survey response of a user to a survey."""
+    # foreign keys are deferred, and pending trigger events of the deletes
+    # would make adding the constraint fail in this same transaction
+    schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    SurveyResponse = apps.get_model('surveys', 'SurveyResponse')
+    Response = apps.get_model('surveys', 'Response')
+    first_pks = (
+        SurveyResponse.objects
+        .values('user_id', 'survey')
+        .annotate(first_pk=Min('pk'))
+        .values('first_pk')
+    )
+    repeated = SurveyResponse.objects.exclude(survey=None).exclude(pk__in=first_pks)
+    Response.objects.filter(survey_responses__in=repeated).delete()
+    repeated.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0006_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_repeated_survey_responses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='surveyresponse',
+            constraint=models.UniqueConstraint(fields=('user_id', 'survey'), name='surveyresponse_user_survey_uniq'),
+        ),
+        migrations.RemoveIndex(
+            model_name='surveyresponse',
+            name='surveyresponse_user_survey_idx',
+        ),
+    ]
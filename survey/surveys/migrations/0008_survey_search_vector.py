@@ -0,0 +1,38 @@
+# Generated by Django 2.2.20 on 2026-10-18 16:52
+
+from django.conf import settings
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vector(apps, schema_editor):
+    Survey = apps.get_model('surveys', 'Survey')
+    config = settings.SURVEY_SEARCH_CONFIG
+    Survey.objects.update(
+        search_vector=(
+            SearchVector('title', weight='A', config=config) +
+            SearchVector('description', weight='B', config=config)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0007_surveyresponse_user_survey_uniq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='survey_search_vector_idx'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
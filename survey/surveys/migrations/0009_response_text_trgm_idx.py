@@ -0,0 +1,21 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # the index is built concurrently, without locking responses for writes
+    atomic = False
+
+    dependencies = [
+        ('surveys', '0008_survey_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # matches the expression Django generates for response_text__icontains
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS response_text_trgm_idx '
+            'ON surveys_response USING gin (UPPER(response_text::text) gin_trgm_ops)',
+            'DROP INDEX CONCURRENTLY IF EXISTS response_text_trgm_idx',
+        ),
+    ]
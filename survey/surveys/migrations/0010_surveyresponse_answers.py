@@ -0,0 +1,24 @@
+# Generated by Django 2.2.20 on 2026-10-18 17:08
+
+import django.contrib.postgres.fields.jsonb
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0009_response_text_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyresponse',
+            name='answers',
+            field=django.contrib.postgres.fields.jsonb.JSONField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='surveyresponse',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['answers'], name='surveyresponse_answers_idx', opclasses=['jsonb_path_ops']),
+        ),
+    ]
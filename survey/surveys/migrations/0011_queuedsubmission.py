@@ -0,0 +1,35 @@
+# Generated by Django 2.2.20 on 2026-10-18 17:11
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0010_surveyresponse_answers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedSubmission',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('receipt', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('payload', django.contrib.postgres.fields.jsonb.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('created', 'created'), ('rejected', 'rejected')], default='pending', max_length=10)),
+                ('result', django.contrib.postgres.fields.jsonb.JSONField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(db_index=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Queued submission',
+                'verbose_name_plural': 'Queued submissions',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='queuedsubmission',
+            index=models.Index(condition=models.Q(status='pending'), fields=['id'], name='queuedsubmission_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.20 on 2026-10-18 17:14
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0011_queuedsubmission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('status_code', models.PositiveSmallIntegerField(null=True)),
+                ('body', django.contrib.postgres.fields.jsonb.JSONField(null=True)),
+                ('cookies', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('headers', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Idempotency key',
+                'verbose_name_plural': 'Idempotency keys',
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.20 on 2026-10-18 17:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0012_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OptionTally',
+            fields=[
+                ('count', models.PositiveIntegerField(default=0)),
+                ('response_option', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='surveys.ResponseOption')),
+            ],
+            options={
+                'verbose_name': 'Option tally',
+                'verbose_name_plural': 'Option tallies',
+            },
+        ),
+        migrations.CreateModel(
+            name='SurveyTally',
+            fields=[
+                ('count', models.PositiveIntegerField(default=0)),
+                ('survey', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='surveys.Survey')),
+            ],
+            options={
+                'verbose_name': 'Survey tally',
+                'verbose_name_plural': 'Survey tallies',
+            },
+        ),
+        migrations.CreateModel(
+            name='TextAnswerTally',
+            fields=[
+                ('count', models.PositiveIntegerField(default=0)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='surveys.Question')),
+            ],
+            options={
+                'verbose_name': 'Text answer tally',
+                'verbose_name_plural': 'Text answer tallies',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.20 on 2026-10-18 17:23
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0013_result_tallies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyResults',
+            fields=[
+                ('survey', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='results', serialize=False, to='surveys.Survey')),
+                ('results', django.contrib.postgres.fields.jsonb.JSONField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Survey results',
+                'verbose_name_plural': 'Survey results',
+            },
+        ),
+    ]
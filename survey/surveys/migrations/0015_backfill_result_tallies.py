@@ -0,0 +1,72 @@
+from django.db import migrations
+
+
+def backfill_result_tallies(apps, schema_editor):
+    """
+    Counts results of survey responses submitted before the tallies were
+    kept, from nested responses and JSONB answer documents alike. Tallies
+    that already exist are overwritten with the recount.
+    """
+    SurveyResponse = apps.get_model('surveys', 'SurveyResponse')
+    Response = apps.get_model('surveys', 'Response')
+    tables = {
+        'survey_tally': apps.get_model('surveys', 'SurveyTally')._meta.db_table,
+        'option_tally': apps.get_model('surveys', 'OptionTally')._meta.db_table,
+        'text_answer_tally': apps.get_model('surveys', 'TextAnswerTally')._meta.db_table,
+        'survey_response': SurveyResponse._meta.db_table,
+        'response': Response._meta.db_table,
+        'response_select': Response._meta.get_field('response_select').remote_field.through._meta.db_table,
+        'response_option': apps.get_model('surveys', 'ResponseOption')._meta.db_table,
+        'question': apps.get_model('surveys', 'Question')._meta.db_table,
+    }
+    # every answer of the JSONB documents, with options of select answers
+    answers = '''
+        SELECT answer.key::int AS question, answer.value, option.value::int AS option
+        FROM {survey_response} survey_response
+        CROSS JOIN LATERAL jsonb_each(survey_response.answers) AS answer
+        LEFT JOIN LATERAL jsonb_array_elements(
+            CASE jsonb_typeof(answer.value) WHEN 'array' THEN answer.value END
+        ) AS option ON true
+        WHERE survey_response.answers IS NOT NULL
+    '''.format(**tables)
+    schema_editor.execute('''
+        INSERT INTO {survey_tally} (survey_id, count)
+        SELECT survey_id, COUNT(*) FROM {survey_response}
+        WHERE survey_id IS NOT NULL
+        GROUP BY survey_id
+        ON CONFLICT (survey_id) DO UPDATE SET count = EXCLUDED.count
+    '''.format(**tables))
+    schema_editor.execute('''
+        INSERT INTO {option_tally} (response_option_id, count)
+        SELECT selected.option, COUNT(*) FROM (
+            SELECT responseoption_id FROM {response_select}
+            UNION ALL
+            SELECT option FROM ({answers}) answer WHERE option IS NOT NULL
+        ) AS selected (option)
+        JOIN {response_option} response_option ON response_option.id = selected.option
+        GROUP BY selected.option
+        ON CONFLICT (response_option_id) DO UPDATE SET count = EXCLUDED.count
+    '''.format(answers=answers, **tables))
+    schema_editor.execute('''
+        INSERT INTO {text_answer_tally} (question_id, count)
+        SELECT answered.question, COUNT(*) FROM (
+            SELECT question_id FROM {response} WHERE response_text <> ''
+            UNION ALL
+            SELECT question FROM ({answers}) answer
+            WHERE jsonb_typeof(answer.value) = 'string' AND answer.value <> '""'
+        ) AS answered (question)
+        JOIN {question} question ON question.id = answered.question AND question.question_type = 'text'
+        GROUP BY answered.question
+        ON CONFLICT (question_id) DO UPDATE SET count = EXCLUDED.count
+    '''.format(answers=answers, **tables))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0014_surveyresults'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_result_tallies, migrations.RunPython.noop),
+    ]
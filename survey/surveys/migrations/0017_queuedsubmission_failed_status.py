@@ -0,0 +1,18 @@
+# Generated by Django 2.2.20 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0016_idempotencykey_request_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='queuedsubmission',
+            name='status',
+            field=models.CharField(choices=[('pending', 'pending'), ('created', 'created'), ('rejected', 'rejected'), ('failed', 'failed')], default='pending', max_length=10),
+        ),
+    ]
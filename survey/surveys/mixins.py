@@ -0,0 +1,138 @@
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Max, Min, QuerySet
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .cache import get_model_version, get_survey_representations
+
+
+class ConditionalGetMixin:
+	"""
+	Answers If-None-Match / If-Modified-Since with 304 Not Modified before
+	anything gets serialized. Validators are the latest updated_at of the
+	objects, fetched with a single query over its index, and for lists the
+	version of the model bumped on every save or deletion, as rows deleted
+	or filtered out leave the latest updated_at as it was. Objects listed
+	until their expiry_field passes also validate on its earliest value.
+	"""
+	expiry_field = None
+
+	def list(self, request, *args, **kwargs):
+		queryset = self.filter_queryset(self.get_queryset())
+		return self._get_conditional_response(
+			queryset,
+			lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+			get_model_version(queryset.model),
+		)
+
+	def retrieve(self, request, *args, **kwargs):
+		lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+		try:
+			queryset = self.filter_queryset(self.get_queryset()).filter(
+				**{self.lookup_field: self.kwargs[lookup_url_kwarg]},
+			)
+		except (TypeError, ValueError, ValidationError):
+			# same as get_object_or_404 on a lookup of the wrong type
+			raise Http404
+		return self._get_conditional_response(
+			queryset,
+			lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+		)
+
+	def _get_conditional_response(self, queryset: QuerySet, get_response: Callable[[], Response],
+								  version: Optional[int] = None) -> Response:
+		aggregates = {'last_modified': Max('updated_at')}
+		if self.expiry_field is not None:
+			aggregates['expires'] = Min(self.expiry_field)
+		validators = queryset.aggregate(**aggregates)
+		if validators['last_modified'] is None:
+			return get_response()
+		etag = self._get_etag(validators['last_modified'], version, validators.get('expires'))
+		last_modified = int(validators['last_modified'].timestamp())
+		response = get_conditional_response(
+			self.request,
+			etag=etag,
+			last_modified=last_modified,
+		) or get_response()
+		if getattr(self, 'served_stale', False):
+			# validators describe the database, not the previous version served
+			response['Cache-Control'] = 'no-cache'
+		elif 200 <= response.status_code < 400:
+			response['ETag'] = etag
+			response['Last-Modified'] = http_date(last_modified)
+		return response
+
+	@staticmethod
+	def _get_etag(last_modified: datetime, version: Optional[int], expires: Optional[datetime]) -> str:
+		parts = [int(last_modified.timestamp() * 10 ** 6), version, expires and int(expires.timestamp())]
+		return 'W/"{}"'.format('-'.join(str(part) for part in parts if part is not None))
+
+
+class CachedSurveyMixin:
+	"""
+	Serves surveys from cache, serializing only the missing ones. Sets
+	served_stale when a survey being rebuilt was served in its previous
+	version.
+	"""
+
+	served_stale = False
+
+	def list(self, request, *args, **kwargs):
+		queryset = self.filter_queryset(self.get_queryset())
+		page = self.paginate_queryset(queryset)
+		if page is not None:
+			return self.get_paginated_response(self._get_representations(page))
+		return Response(self._get_representations(list(queryset)))
+
+	def retrieve(self, request, *args, **kwargs):
+		instance = self.get_object()
+		return Response(self._get_representations([instance])[0])
+
+	def _get_representations(self, surveys):
+		stale = set()
+		representations = get_survey_representations(
+			surveys,
+			lambda missing: self.get_serializer(missing, many=True).data,
+			stale,
+		)
+		self.served_stale = bool(stale)
+		return representations
+
+
+class StreamingListMixin:
+	"""
+	Streams the list as a JSON array when pagination is off or the client
+	asks for it (see PageNumberOrKeysetPagination), serializing
+	LIST_STREAM_CHUNK_SIZE objects at a time. Memory use depends on the
+	chunk size rather than on the length of the list.
+	"""
+
+	def list(self, request, *args, **kwargs):
+		if self.paginator is not None and not self.paginator.is_stream_requested(request):
+			return super().list(request, *args, **kwargs)
+		queryset = self.filter_queryset(self.get_queryset())
+		return StreamingHttpResponse(self._stream_json(queryset), content_type='application/json')
+
+	def _stream_json(self, queryset: QuerySet) -> Iterator[bytes]:
+		"""
+		Walks pks of the queryset in its order through a server-side cursor
+		and fetches objects chunk by chunk, along with their prefetches.
+		"""
+		renderer = JSONRenderer()
+		chunk_size = settings.LIST_STREAM_CHUNK_SIZE
+		pks = queryset.values_list('pk', flat=True).iterator(chunk_size=chunk_size)
+		separator = b'['
+		while chunk := [pk for _, pk in zip(range(chunk_size), pks)]:
+			objects = queryset.in_bulk(chunk)
+			data = self.get_serializer([objects[pk] for pk in chunk if pk in objects], many=True).data
+			yield separator + renderer.render(data)[1:-1]
+			separator = b','
+		yield b'[]' if separator == b'[' else b']'
@@ -1,38 +1,95 @@
+import uuid
+from collections import Counter
 from datetime import datetime
+from typing import Dict, List
 
-from django.db import models
-from django.db.models import Q
+from django.conf import settings
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField
+from django.db import connections, models
+from django.db.models import F, Prefetch, Q
 from django.utils import timezone
 
 
+def questions_prefetch() -> Prefetch:
+	"""Lookup for survey questions along with their response options."""
+	return Prefetch(
+		'questions',
+		queryset=Question.objects.prefetch_related('response_options'),
+	)
+
+
 class SurveyQuerySet(models.QuerySet):
 	def get_active_surveys(self):
 		"""Only get surveys that are not overdue."""
 		now = datetime.now(tz=timezone.utc)
 		return self.filter(end_date__gt=now)
 
+	def search(self, text: str):
+		"""Surveys matching the text, ranked by relevance."""
+		query = SearchQuery(text, config=settings.SURVEY_SEARCH_CONFIG)
+		return (
+			self.filter(search_vector=query)
+			.annotate(rank=SearchRank(F('search_vector'), query))
+			.order_by('-rank', *Survey._meta.ordering)
+		)
+
+	def update_search_vector(self) -> int:
+		"""Refreshes full-text search vectors from titles and descriptions."""
+		config = settings.SURVEY_SEARCH_CONFIG
+		return self.update(
+			search_vector=(
+				SearchVector('title', weight='A', config=config) +
+				SearchVector('description', weight='B', config=config)
+			),
+		)
+
+	def with_questions(self):
+		"""
+		Prefetches nested questions and their response options, so that
+		serializing any number of surveys costs a constant number of queries.
+		"""
+		return self.prefetch_related(questions_prefetch())
+
 
 class Survey(models.Model):
 	"""
 	Survey questionnare list with nested questions and response options.
 	"""
 	objects = SurveyQuerySet.as_manager()
-	title = models.CharField(max_length=300, db_index=True, blank=False)
+	title = models.CharField(max_length=300, blank=False)
 	start_date = models.DateTimeField(blank=False)
 	end_date = models.DateTimeField(blank=False)
-	description = models.TextField(db_index=True, blank=True)
+	description = models.TextField(blank=True)
+	updated_at = models.DateTimeField(auto_now=True, db_index=True)
+	search_vector = SearchVectorField(null=True, editable=False)
 
 	class Meta:
 		verbose_name = 'Survey'
 		verbose_name_plural = 'Surveys'
 		ordering = ['start_date', 'title']
+		indexes = [
+			# active surveys
+			models.Index(fields=['end_date'], name='survey_end_date_idx'),
+			# default ordering
+			models.Index(fields=['start_date', 'title'], name='survey_start_date_title_idx'),
+			GinIndex(fields=['search_vector'], name='survey_search_vector_idx'),
+		]
 
 	def __str__(self):
 		return self.title
 
 
+class QuestionQuerySet(models.QuerySet):
+	def with_related(self):
+		"""Fetches related survey and response options in bulk."""
+		return self.select_related('survey').prefetch_related('response_options')
+
+
 class Question(models.Model):
 	"""Question with nested response options."""
+	objects = QuestionQuerySet.as_manager()
 	TEXT = 'text'
 	SELECT = 'select'
 	SELECT_MULTIPLE = 'select multiple'
@@ -48,16 +105,22 @@ class Question(models.Model):
 		on_delete=models.SET_NULL,
 		related_name='questions',
 		null=True,
+		db_index=False,
 	)
 	question_type = models.CharField(
 		max_length=200,
 		choices=QUESTION_TYPES,
 		default=TEXT,
 	)
+	updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
 	class Meta:
 		verbose_name = 'Question'
 		verbose_name_plural = 'Questions'
+		indexes = [
+			# survey questions, ordered by survey
+			models.Index(fields=['survey', 'id'], name='question_survey_id_idx'),
+		]
 
 	def __str__(self):
 		return self.title
@@ -106,6 +169,17 @@ class Response(models.Model):
 		return self.response_text or str(self.response_select)
 
 
+def answers_document(responses: List[dict]) -> dict:
+	"""Answers of a submission keyed by question id, as kept in SurveyResponse.answers."""
+	return {
+		str(data['question']): (
+			list(dict.fromkeys(data['response_select']))
+			if data.get('response_select') else data.get('response_text', '')
+		)
+		for data in responses
+	}
+
+
 class SurveyResponseQuerySet(models.QuerySet):
 	def by_user(self, user_id: str):
 		return self.filter(user_id=user_id)
@@ -114,9 +188,97 @@ class SurveyResponseQuerySet(models.QuerySet):
 		"""Returns True if user has already taken the survey previously."""
 		return self.filter(Q(survey=survey_pk) & Q(user_id=user_id)).exists()
 
+	def with_responses(self):
+		"""
+		Prefetches nested responses with their questions and selected
+		options, so that a page of survey responses costs a constant
+		number of queries.
+		"""
+		return self.prefetch_related(
+			Prefetch(
+				'responses',
+				queryset=Response.objects.select_related('question').prefetch_related(
+					'response_select',
+				),
+			),
+		)
+
+	def for_representation(self):
+		"""
+		Prefetches nested responses unless answers are stored as JSONB
+		documents, which are rendered without any further queries.
+		"""
+		if settings.SURVEY_RESPONSES_STORAGE == self.model.JSONB:
+			return self
+		return self.with_responses()
+
+	def bulk_create_submissions(self, submissions: List[dict]) -> List['SurveyResponse']:
+		"""
+		Inserts survey responses the way SURVEY_RESPONSES_STORAGE tells to
+		and adds their answers to the result tallies. Meant to be called
+		within the transaction saving the submissions.
+		"""
+		if settings.SURVEY_RESPONSES_STORAGE == self.model.JSONB:
+			survey_responses = self.bulk_create_with_answers(submissions)
+		else:
+			survey_responses = self.bulk_create_with_responses(submissions)
+		count_submissions(submissions)
+		return survey_responses
+
+	def bulk_create_with_answers(self, submissions: List[dict]) -> List['SurveyResponse']:
+		"""
+		Inserts survey responses with their answers kept in a single JSONB
+		document each, with one INSERT query. Result tallies are upserted
+		separately, by bulk_create_submissions.
+		"""
+		return self.bulk_create([
+			self.model(
+				user_id=submission['user_id'],
+				survey_id=submission['survey'],
+				answers=answers_document(submission['responses']),
+			)
+			for submission in submissions
+		])
+
+	def bulk_create_with_responses(self, submissions: List[dict]) -> List['SurveyResponse']:
+		"""
+		Inserts survey responses with four INSERT queries, however many
+		survey responses and responses there are: survey responses, responses,
+		selected response options and links of responses to survey responses.
+		Submissions refer to the survey, questions and options by pk.
+		"""
+		survey_responses = self.bulk_create([
+			self.model(user_id=submission['user_id'], survey_id=submission['survey'])
+			for submission in submissions
+		])
+		responses = iter(Response.objects.bulk_create([
+			Response(question_id=data['question'], response_text=data.get('response_text', ''))
+			for submission in submissions for data in submission['responses']
+		]))
+		ResponseSelect = Response.response_select.through
+		SurveyResponseResponses = self.model.responses.through
+		selected, links = [], []
+		for survey_response, submission in zip(survey_responses, submissions):
+			for data in submission['responses']:
+				response = next(responses)
+				links.append(SurveyResponseResponses(
+					surveyresponse_id=survey_response.pk,
+					response_id=response.pk,
+				))
+				selected.extend(
+					ResponseSelect(response_id=response.pk, responseoption_id=option_pk)
+					for option_pk in dict.fromkeys(data.get('response_select', []))
+				)
+		ResponseSelect.objects.bulk_create(selected)
+		SurveyResponseResponses.objects.bulk_create(links)
+		return survey_responses
+
 
 class SurveyResponse(models.Model):
 	"""Survey responses list with nested responses."""
+	TABLES = 'tables'
+	JSONB = 'jsonb'
+
 	objects = SurveyResponseQuerySet.as_manager()
 	user_id = models.CharField(max_length=100, blank=False)
 	survey = models.ForeignKey(
@@ -130,10 +292,232 @@ class SurveyResponse(models.Model):
 		related_name='survey_responses',
 		blank=False,
 	)
+	# {question id: response text or selected option ids}, used instead
+	# of nested responses in the JSONB storage mode
+	answers = JSONField(null=True, editable=False)
 
 	class Meta:
 		verbose_name = 'Survey response'
 		verbose_name_plural = 'Survey responses'
+		constraints = [
+			# a survey is taken once; also serves respondent's lookups
+			models.UniqueConstraint(fields=['user_id', 'survey'], name='surveyresponse_user_survey_uniq'),
+		]
+		indexes = [
+			GinIndex(fields=['answers'], name='surveyresponse_answers_idx', opclasses=['jsonb_path_ops']),
+		]
 
 	def __str__(self):
 		return f'{self.survey}-{self.user_id}'
+
+
+def count_submissions(submissions: List[dict]) -> None:
+	"""
+	Adds respondents, selected response options and text answers of the
+	submissions to the result tallies, with three upserts. The survey
+	tally goes first: submissions to a survey line up on it.
+	"""
+	respondents, selected, text_answers = Counter(), Counter(), Counter()
+	for submission in submissions:
+		respondents[submission['survey']] += 1
+		for data in submission['responses']:
+			if data.get('response_select'):
+				selected.update(dict.fromkeys(data['response_select'], 1))
+			elif data.get('response_text'):
+				text_answers[data['question']] += 1
+	SurveyTally.objects.increment(respondents)
+	OptionTally.objects.increment(selected)
+	TextAnswerTally.objects.increment(text_answers)
+
+
+class TallyQuerySet(models.QuerySet):
+	def increment(self, counts: Dict[int, int]) -> None:
+		"""
+		Adds counts to the tallies keyed by pk, creating missing ones, with
+		one INSERT ... ON CONFLICT query. Tallies are locked in pk order, so
+		that concurrent submissions don't deadlock.
+		"""
+		self._upsert(counts, '{table}.count + EXCLUDED.count')
+
+	def overwrite(self, counts: Dict[int, int]) -> None:
+		"""
+		Sets the tallies keyed by pk to counts, creating missing ones.
+		Lowering a tally by a negative increment would be refused, as
+		constraints are checked on the row proposed for insertion first.
+		"""
+		self._upsert(counts, 'EXCLUDED.count')
+
+	def _upsert(self, counts: Dict[int, int], count: str) -> None:
+		if not counts:
+			return
+		table = self.model._meta.db_table
+		pk = self.model._meta.pk.column
+		pks, values = zip(*sorted(counts.items()))
+		with connections[self.db].cursor() as cursor:
+			cursor.execute(
+				f'''
+				INSERT INTO {table} ({pk}, count)
+				SELECT * FROM unnest(%s::integer[], %s::integer[]) ORDER BY 1
+				ON CONFLICT ({pk}) DO UPDATE
+				SET count = {count.format(table=table)}
+				''',
+				[list(pks), list(values)],
+			)
+
+	def counts(self, pks) -> Dict[int, int]:
+		return dict(self.filter(pk__in=pks).values_list('pk', 'count'))
+
+
+class Tally(models.Model):
+	"""
+	Counter of survey results, updated in the transaction of every
+	submission. Rebuilt from survey responses by rebuild_result_tallies.
+	"""
+	objects = TallyQuerySet.as_manager()
+	count = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		abstract = True
+
+
+class SurveyTally(Tally):
+	"""Number of survey responses to the survey."""
+	survey = models.OneToOneField(Survey, on_delete=models.CASCADE, primary_key=True, related_name='tally')
+
+	class Meta:
+		verbose_name = 'Survey tally'
+		verbose_name_plural = 'Survey tallies'
+
+	def __str__(self):
+		return f'{self.survey_id}: {self.count}'
+
+
+class OptionTally(Tally):
+	"""Number of survey responses selecting the response option."""
+	response_option = models.OneToOneField(
+		ResponseOption,
+		on_delete=models.CASCADE,
+		primary_key=True,
+		related_name='tally',
+	)
+
+	class Meta:
+		verbose_name = 'Option tally'
+		verbose_name_plural = 'Option tallies'
+
+	def __str__(self):
+		return f'{self.response_option_id}: {self.count}'
+
+
+class TextAnswerTally(Tally):
+	"""Number of text answers to the question."""
+	question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='tally')
+
+	class Meta:
+		verbose_name = 'Text answer tally'
+		verbose_name_plural = 'Text answer tallies'
+
+	def __str__(self):
+		return f'{self.question_id}: {self.count}'
+
+
+class SurveyResults(models.Model):
+	"""Survey results as computed from survey responses by compute_results."""
+	survey = models.OneToOneField(Survey, on_delete=models.CASCADE, primary_key=True, related_name='results')
+	results = JSONField()
+	computed_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		verbose_name = 'Survey results'
+		verbose_name_plural = 'Survey results'
+
+	def __str__(self):
+		return f'{self.survey_id}: {self.computed_at}'
+
+
+class QueuedSubmission(models.Model):
+	"""
+	Survey response queued by the asynchronous submission mode, waiting
+	for the process_submissions worker. Clients poll it by the receipt.
+	"""
+	PENDING = 'pending'
+	CREATED = 'created'
+	REJECTED = 'rejected'
+	FAILED = 'failed'
+
+	STATUSES = (
+		(PENDING, 'pending'),
+		(CREATED, 'created'),
+		(REJECTED, 'rejected'),
+		(FAILED, 'failed'),
+	)
+	receipt = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+	payload = JSONField()
+	status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+	# pk of the created survey response or validation errors
+	result = JSONField(null=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	processed_at = models.DateTimeField(null=True, db_index=True)
+
+	class Meta:
+		verbose_name = 'Queued submission'
+		verbose_name_plural = 'Queued submissions'
+		indexes = [
+			# head of the queue
+			models.Index(fields=['id'], name='queuedsubmission_pending_idx', condition=Q(status='pending')),
+		]
+
+	def __str__(self):
+		return f'{self.receipt}-{self.status}'
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+	def live(self):
+		return self.filter(expires_at__gt=timezone.now())
+
+	def reserve(self, key: str, request_hash: str, timeout: int) -> bool:
+		"""
+		Takes the key for a request about to be processed, unless a live
+		request or its stored response already holds it. Expired keys are
+		taken over in the same statement.
+		"""
+		table = self.model._meta.db_table
+		with connections[self.db].cursor() as cursor:
+			cursor.execute(
+				f'''
+				INSERT INTO {table} (key, request_hash, cookies, headers, expires_at)
+				VALUES (%s, %s, '{{}}', '{{}}', now() + %s * interval '1 second')
+				ON CONFLICT (key) DO UPDATE
+				SET request_hash = EXCLUDED.request_hash, status_code = NULL, body = NULL,
+					cookies = '{{}}', headers = '{{}}', expires_at = EXCLUDED.expires_at
+				WHERE {table}.expires_at <= now()
+				RETURNING key
+				''',
+				[key, request_hash, timeout],
+			)
+			return cursor.fetchone() is not None
+
+
+class IdempotencyKey(models.Model):
+	"""
+	Response to a request sent with an Idempotency-Key header, replayed
+	when the request is retried. Without a status code the request is
+	still being processed. The key is a digest of the header along with
+	the endpoint and the caller it was sent by.
+	"""
+	objects = IdempotencyKeyQuerySet.as_manager()
+	key = models.CharField(max_length=255, primary_key=True)
+	# SHA-256 of the request body, to tell retries from other requests
+	request_hash = models.CharField(max_length=64, default='')
+	status_code = models.PositiveSmallIntegerField(null=True)
+	body = JSONField(null=True)
+	cookies = JSONField(default=dict)
+	headers = JSONField(default=dict)
+	expires_at = models.DateTimeField(db_index=True)
+
+	class Meta:
+		verbose_name = 'Idempotency key'
+		verbose_name_plural = 'Idempotency keys'
+
+	def __str__(self):
+		return self.key
@@ -0,0 +1,176 @@
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+def estimate_count(queryset: QuerySet) -> int:
+	"""Number of rows the Postgres planner expects the queryset to return."""
+	sql, params = queryset.query.sql_with_params()
+	with connections[queryset.db].cursor() as cursor:
+		cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+		plan = cursor.fetchone()[0]
+	if isinstance(plan, str):
+		plan = json.loads(plan)
+	return plan[0]['Plan']['Plan Rows']
+
+
+class EstimatedCountPage(Page):
+	"""Page that may know whether another one follows regardless of the count."""
+
+	def __init__(self, object_list, number, paginator, has_more=None):
+		super().__init__(object_list, number, paginator)
+		self.has_more = has_more
+
+	def has_next(self):
+		if self.has_more is None:
+			return super().has_next()
+		return self.has_more
+
+
+class EstimatedCountPaginator(Paginator):
+	"""
+	Trusts the planner estimate for large querysets instead of running an
+	exact COUNT(*), which scans the whole table. Querysets estimated below
+	PAGINATION_COUNT_ESTIMATE_THRESHOLD rows are counted exactly.
+
+	An estimate may be off either way, so it doesn't bound pages: a page
+	fetches one row more than it holds to tell whether there is a next one,
+	and only a page past the last row is empty.
+	"""
+	count_is_exact = True
+
+	@cached_property
+	def count(self):
+		if not isinstance(self.object_list, QuerySet):
+			return super().count
+		estimate = estimate_count(self.object_list)
+		if estimate < settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+			return super().count
+		self.count_is_exact = False
+		return estimate
+
+	def validate_number(self, number):
+		self.count  # tells whether the count is exact
+		if self.count_is_exact:
+			return super().validate_number(number)
+		try:
+			number = int(number)
+		except (TypeError, ValueError):
+			raise PageNotAnInteger(_('That page number is not an integer'))
+		if number < 1:
+			raise EmptyPage(_('That page number is less than 1'))
+		return number
+
+	def page(self, number):
+		number = self.validate_number(number)
+		if self.count_is_exact:
+			return super().page(number)
+		bottom = (number - 1) * self.per_page
+		object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+		if not object_list and number > 1:
+			raise EmptyPage(_('That page contains no results'))
+		page_list = object_list[:self.per_page]
+		# never reports fewer rows than there are up to this page
+		self.count = max(self.count, bottom + len(page_list))
+		return self._get_page(page_list, number, self, has_more=len(object_list) > self.per_page)
+
+	def _get_page(self, *args, **kwargs):
+		return EstimatedCountPage(*args, **kwargs)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+	"""Page number pagination telling whether `count` is exact or estimated."""
+	django_paginator_class = EstimatedCountPaginator
+
+	def get_paginated_response(self, data):
+		return Response(OrderedDict([
+			('count', self.page.paginator.count),
+			('count_is_exact', self.page.paginator.count_is_exact),
+			('next', self.get_next_link()),
+			('previous', self.get_previous_link()),
+			('results', data),
+		]))
+
+	def get_paginated_response_schema(self, schema):
+		response_schema = super().get_paginated_response_schema(schema)
+		response_schema['properties']['count_is_exact'] = {'type': 'boolean'}
+		return response_schema
+
+
+class KeysetPagination(CursorPagination):
+	"""
+	Cursor pagination over the primary key. Fetching a page costs the same
+	regardless of its depth, and pages don't shift when new rows arrive.
+	"""
+	ordering = 'pk'
+
+
+class PageNumberOrKeysetPagination(BasePagination):
+	"""
+	Page number pagination, unless the client asks for keyset pagination
+	with `?pagination=cursor` or follows a cursor link. Views listing with
+	StreamingListMixin stream the whole list on `?pagination=stream`.
+	"""
+	mode_query_param = 'pagination'
+	keyset_mode = 'cursor'
+	stream_mode = 'stream'
+	page_number_class = EstimatedCountPagination
+	keyset_class = KeysetPagination
+
+	def __init__(self):
+		self.paginator = self.page_number_class()
+
+	def is_keyset_requested(self, request) -> bool:
+		return (
+			request.query_params.get(self.mode_query_param) == self.keyset_mode or
+			self.keyset_class.cursor_query_param in request.query_params
+		)
+
+	def is_stream_requested(self, request) -> bool:
+		"""Also true once pagination is off, as listing everything is best streamed."""
+		return (
+			request.query_params.get(self.mode_query_param) == self.stream_mode or
+			self.paginator.get_page_size(request) is None
+		)
+
+	def paginate_queryset(self, queryset, request, view=None):
+		if self.is_keyset_requested(request):
+			self.paginator = self.keyset_class()
+		return self.paginator.paginate_queryset(queryset, request, view)
+
+	def get_paginated_response(self, data):
+		return self.paginator.get_paginated_response(data)
+
+	def get_paginated_response_schema(self, schema):
+		return self.paginator.get_paginated_response_schema(schema)
+
+	def to_html(self):
+		return self.paginator.to_html()
+
+	@property
+	def display_page_controls(self):
+		return self.paginator.display_page_controls
+
+	def get_results(self, data):
+		return self.paginator.get_results(data)
+
+	def get_schema_fields(self, view):
+		return (
+			self.page_number_class().get_schema_fields(view) +
+			self.keyset_class().get_schema_fields(view)
+		)
+
+	def get_schema_operation_parameters(self, view):
+		return (
+			self.page_number_class().get_schema_operation_parameters(view) +
+			self.keyset_class().get_schema_operation_parameters(view)
+		)
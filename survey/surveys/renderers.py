@@ -0,0 +1,16 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class CSVRenderer(JSONRenderer):
+	"""
+	Lets ?format=csv through content negotiation to views streaming CSV
+	themselves. Errors are still rendered as JSON.
+	"""
+	media_type = 'text/csv'
+	format = 'csv'
+
+
+class NDJSONRenderer(JSONRenderer):
+	"""Same as CSVRenderer, for ?format=ndjson."""
+	media_type = 'application/x-ndjson'
+	format = 'ndjson'
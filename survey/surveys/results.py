@@ -0,0 +1,174 @@
+import json
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from django.db import connections, transaction
+from django.db.models import Count, Q
+
+from .models import (
+	OptionTally,
+	Question,
+	ResponseOption,
+	SurveyResponse,
+	SurveyResults,
+	SurveyTally,
+	TextAnswerTally,
+)
+from .schemas import SurveySchema, load_survey_schemas
+
+
+# answers of survey responses stored as JSONB documents, grouped by question
+# and selected option; option is NULL for text answers
+JSONB_ANSWER_COUNTS_SQL = '''
+	SELECT answer.key::int, option.value::int, COUNT(*)
+	FROM {table} survey_response
+	CROSS JOIN LATERAL jsonb_each(survey_response.answers) AS answer
+	LEFT JOIN LATERAL jsonb_array_elements(
+		CASE jsonb_typeof(answer.value) WHEN 'array' THEN answer.value END
+	) AS option ON true
+	WHERE survey_response.survey_id = %s AND survey_response.answers IS NOT NULL AND answer.value <> '""'
+	GROUP BY 1, 2
+'''
+
+
+def count_answers(survey_pk: int) -> Tuple[int, Dict[int, int], Dict[int, int]]:
+	"""
+	Counts respondents of the survey, times each response option was
+	selected and text answers per question, with grouped aggregate queries
+	over both nested responses and JSONB answer documents.
+	"""
+	respondents = SurveyResponse.objects.filter(survey=survey_pk).count()
+	option_counts = Counter(dict(
+		ResponseOption.objects
+		.filter(question__survey=survey_pk)
+		.annotate(selected=Count('responses'))
+		.values_list('pk', 'selected')
+	))
+	text_counts = Counter(dict(
+		Question.objects
+		.filter(survey=survey_pk, question_type=Question.TEXT)
+		.annotate(answers=Count('responses', filter=~Q(responses__response_text='')))
+		.values_list('pk', 'answers')
+	))
+	with connections[SurveyResponse.objects.db].cursor() as cursor:
+		cursor.execute(
+			JSONB_ANSWER_COUNTS_SQL.format(table=SurveyResponse._meta.db_table),
+			[survey_pk],
+		)
+		for question_pk, option_pk, count in cursor.fetchall():
+			if option_pk is None:
+				text_counts[question_pk] += count
+			else:
+				option_counts[option_pk] += count
+	return respondents, option_counts, text_counts
+
+
+def read_tallies(schema: SurveySchema) -> Tuple[int, Dict[int, int], Dict[int, int]]:
+	"""
+	Same counts as count_answers, read from the result tallies by pk:
+	the cost depends on the number of response options only.
+	"""
+	return (
+		SurveyTally.objects.counts([schema.pk]).get(schema.pk, 0),
+		Counter(OptionTally.objects.counts(schema.option_questions)),
+		Counter(TextAnswerTally.objects.counts(_text_questions(schema))),
+	)
+
+
+def rebuild_tallies(schema: SurveySchema, verify: bool = False) -> bool:
+	"""
+	Recounts the survey results from survey responses and tells whether
+	the result tallies were right. Unless only verifying, overwrites the
+	tallies. Submissions to the survey wait while it is recounted.
+	"""
+	with transaction.atomic():
+		# locks the survey tally till the end of the transaction
+		SurveyTally.objects.increment({schema.pk: 0})
+		respondents, option_counts, text_counts = count_answers(schema.pk)
+		expected = (
+			(SurveyTally, {schema.pk: respondents}),
+			(OptionTally, {pk: option_counts[pk] for pk in schema.option_questions}),
+			(TextAnswerTally, {pk: text_counts[pk] for pk in _text_questions(schema)}),
+		)
+		consistent = True
+		for model, counts in expected:
+			tallies = model.objects.counts(counts)
+			if wrong := {pk: count for pk, count in counts.items() if count != tallies.get(pk, 0)}:
+				consistent = False
+				if not verify:
+					model.objects.overwrite(wrong)
+		return consistent
+
+
+def compute_results(schema: SurveySchema) -> dict:
+	"""Survey results aggregated from survey responses."""
+	return build_results(schema, *count_answers(schema.pk))
+
+
+def live_results(schema: SurveySchema) -> dict:
+	"""Survey results read from the result tallies."""
+	return build_results(schema, *read_tallies(schema))
+
+
+def save_results(survey_pks: List[int], output_dir: Optional[str] = None) -> int:
+	"""
+	Computes results of the surveys and saves them into SurveyResults, or
+	into <survey id>.json files in output_dir. Returns the number of
+	surveys computed; surveys that don't exist are skipped.
+	"""
+	results = [compute_results(schema) for schema in load_survey_schemas(survey_pks).values()]
+	if output_dir is not None:
+		for survey_results in results:
+			with open(os.path.join(output_dir, f'{survey_results["survey"]}.json'), 'w') as file:
+				json.dump(survey_results, file)
+		return len(results)
+	with transaction.atomic():
+		SurveyResults.objects.filter(pk__in=[survey_results['survey'] for survey_results in results]).delete()
+		SurveyResults.objects.bulk_create(
+			SurveyResults(survey_id=survey_results['survey'], results=survey_results) for survey_results in results
+		)
+	return len(results)
+
+
+def build_results(schema: SurveySchema, respondents: int,
+				  option_counts: Dict[int, int], text_counts: Dict[int, int]) -> dict:
+	"""
+	Per-question results of the survey: how many times every response
+	option was selected, also as a percentage of respondents, and how many
+	text answers were given.
+	"""
+	questions = []
+	for question in schema.questions.values():
+		result = {
+			'question': question.pk,
+			'title': question.title,
+			'question_type': question.question_type,
+		}
+		if question.question_type == Question.TEXT:
+			result['answers'] = text_counts[question.pk]
+		else:
+			result['options'] = [
+				{
+					'option': pk,
+					'title': title,
+					'count': option_counts[pk],
+					'percentage': _percentage(option_counts[pk], respondents),
+				}
+				for pk, title in question.options.items()
+			]
+		questions.append(result)
+	return {
+		'survey': schema.pk,
+		'title': schema.title,
+		'respondents': respondents,
+		'questions': questions,
+	}
+
+
+def _percentage(count: int, total: int) -> float:
+	return round(count * 100 / total, 2) if total else 0.0
+
+
+def _text_questions(schema: SurveySchema):
+	return [pk for pk, question in schema.questions.items() if question.question_type == Question.TEXT]
@@ -0,0 +1,234 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from rest_framework.serializers import ValidationError
+
+from .models import Question, ResponseOption, Survey
+
+
+class QuestionSchema(NamedTuple):
+	pk: int
+	title: str
+	question_type: str
+	options: Dict[int, str]  # response option titles by pk
+
+
+def check_response_type(question: Union[Question, QuestionSchema], response: dict) -> None:
+	"""Checks the response fits its question type."""
+	q_pk, q_title = question.pk, question.title
+	is_sel = question.question_type == Question.SELECT
+	is_selmult = question.question_type == Question.SELECT_MULTIPLE
+	is_txt = question.question_type == Question.TEXT
+
+	if is_selmult and len(response.get('response_select', [])) < 2:
+		raise ValidationError(
+			f'Multiple items should be selected for question {q_pk} "{q_title}"'
+		)
+	elif is_sel and len(response.get('response_select', [])) > 1:
+		raise ValidationError(
+			f'Only one item should be selected for question {q_pk} "{q_title}"'
+		)
+	elif is_txt and not response.get('response_text'):
+		raise ValidationError(
+			f'response_text field is empty for question {q_pk} "{q_title}"'
+		)
+	if (is_sel or is_selmult) and not response.get('response_select'):
+		raise ValidationError(
+			f'response_select field is empty for question {q_pk} "{q_title}"'
+		)
+
+
+def pop_redundant_fields(question: Union[Question, QuestionSchema], response: dict) -> None:
+	if question.question_type in (Question.SELECT, Question.SELECT_MULTIPLE):
+		response.pop('response_text', None)
+	elif question.question_type == Question.TEXT:
+		response.pop('response_select', None)
+
+
+class SurveySchema:
+	"""
+	Survey questions and their response options compiled into plain data,
+	so that survey responses are validated without touching the database.
+	"""
+
+	def __init__(self, pk: int, title: str, questions: Dict[int, QuestionSchema]) -> None:
+		self.pk = pk
+		self.title = title
+		self.questions = questions
+		self.option_questions = {
+			option_pk: question.pk
+			for question in questions.values() for option_pk in question.options
+		}
+
+	def __str__(self):
+		return self.title
+
+	def get_question(self, pk: int) -> Optional[Question]:
+		"""Returns an unsaved stand-in of the survey question, no query made."""
+		if (question := self.questions.get(pk)) is None:
+			return None
+		return Question(
+			pk=question.pk,
+			survey_id=self.pk,
+			title=question.title,
+			question_type=question.question_type,
+		)
+
+	def get_response_option(self, pk: int) -> Optional[ResponseOption]:
+		"""Returns an unsaved stand-in of the response option, no query made."""
+		if (question_pk := self.option_questions.get(pk)) is None:
+			return None
+		title = self.questions[question_pk].options[pk]
+		return ResponseOption(pk=pk, question_id=question_pk, title=title)
+
+	def validate_response(self, response: dict) -> dict:
+		"""Checks the response fits its question type, drops redundant fields."""
+		if (question := self.questions.get(response['question'])) is None:
+			# reported along with the other unrelated questions
+			return response
+		check_response_type(question, response)
+		pop_redundant_fields(question, response)
+		return response
+
+	def validate_responses(self, responses: List[dict],
+						   option_titles: Optional[Dict[int, str]] = None) -> List[dict]:
+		"""
+		Checks every survey question is answered once with related options.
+		Titles of options from other surveys may be passed for error messages.
+		"""
+		if len(responses) < len(self.questions):
+			raise ValidationError('You have not answered all the survey questions')
+		elif len(responses) > len(self.questions):
+			raise ValidationError('You have answered some questions more than once')
+
+		responses_questions_ids = {resp['question'] for resp in responses}
+		survey_questions_ids = set(self.questions)
+		if responses_questions_ids < survey_questions_ids:
+			invalid_ids = survey_questions_ids - responses_questions_ids
+			raise ValidationError(f'You haven\'t asnswered questions {invalid_ids}')
+		if responses_questions_ids != survey_questions_ids:
+			invalid_ids = responses_questions_ids - survey_questions_ids
+			raise ValidationError(
+				f'These questions are not related to the survey: {invalid_ids}'
+			)
+		for resp in responses:
+			self._validate_response_options(resp, option_titles or {})
+		return responses
+
+	def _validate_response_options(self, response: dict, option_titles: Dict[int, str]) -> None:
+		"""Check if all selected response options are related to the question."""
+		question = self.questions[response['question']]
+		for option_pk in response.get('response_select', []):
+			if option_pk in question.options:
+				continue
+			if (option_question_pk := self.option_questions.get(option_pk)) is not None:
+				option_title = self.questions[option_question_pk].options[option_pk]
+			else:
+				option_title = option_titles.get(option_pk)
+			option = f'{option_pk} "{option_title}"' if option_title is not None else option_pk
+			valid_options = ', '.join(
+				[f'{pk} "{title}"' for pk, title in question.options.items()]
+			)
+			raise ValidationError(
+				f'Response option {option} is unrelated to the question '
+				f'{question.pk} "{question.title}". '
+				f'Valid options are: {valid_options}'
+			)
+
+
+# {question id: response text or selected option ids}
+AnswersDocument = Dict[str, Union[str, List[int]]]
+
+
+class AnswerTitles(NamedTuple):
+	"""Titles of questions and response options by pk, for those missing from survey schemas."""
+	questions: Dict[int, str]
+	options: Dict[int, str]
+
+
+def load_answer_titles(documents: Iterable[Tuple[AnswersDocument, Optional[SurveySchema]]]) -> AnswerTitles:
+	"""
+	Looks up titles of questions and response options that answer documents
+	refer to but their survey schemas don't have, e.g. once the survey is
+	deleted or a question is moved out of it. A query per kind, if any.
+	"""
+	question_pks, option_pks = set(), set()
+	for answers, schema in documents:
+		questions = schema.questions if schema is not None else {}
+		for question_pk, answer in answers.items():
+			question = questions.get(int(question_pk))
+			if question is None:
+				question_pks.add(int(question_pk))
+			if isinstance(answer, list):
+				option_pks.update(pk for pk in answer if question is None or pk not in question.options)
+	return AnswerTitles(
+		dict(Question.objects.filter(pk__in=question_pks).values_list('pk', 'title')) if question_pks else {},
+		dict(ResponseOption.objects.filter(pk__in=option_pks).values_list('pk', 'title')) if option_pks else {},
+	)
+
+
+def render_answers(answers: AnswersDocument,
+				   schema: Optional[SurveySchema], titles: Optional[AnswerTitles] = None) -> List[dict]:
+	"""
+	Renders an answers document of a survey response the same way
+	ResponseSerializer renders nested responses, titles taken from the
+	schema, or from titles for questions and options missing from it.
+	"""
+	questions = schema.questions if schema is not None else {}
+	titles = titles or AnswerTitles({}, {})
+	rendered = []
+	for question_pk, answer in answers.items():
+		question = questions.get(int(question_pk))
+		options = question.options if question is not None else {}
+		response_select = answer if isinstance(answer, list) else []
+		select_titles = [options.get(pk, titles.options.get(pk)) for pk in response_select]
+		rendered.append({
+			'question': int(question_pk),
+			'question_title': question.title if question is not None else titles.questions.get(
+				int(question_pk), 'deleted',
+			),
+			'response_text': answer if isinstance(answer, str) else '',
+			'response_select': response_select,
+			'response_select_titles': [title for title in select_titles if title is not None],
+		})
+	return rendered
+
+
+def get_survey_pk(data) -> Optional[int]:
+	"""Returns the survey pk of submitted raw data, if there is a valid one."""
+	try:
+		return int(data['survey'])
+	except (KeyError, TypeError, ValueError):
+		return None
+
+
+def load_survey_schemas(survey_pks: Iterable[int]) -> Dict[int, SurveySchema]:
+	"""Compiles schemas of the surveys, keyed by survey pk, in a single query."""
+	rows = (
+		Survey.objects
+		.filter(pk__in=set(survey_pks))
+		.order_by('pk', 'questions', 'questions__response_options')
+		.values_list(
+			'pk',
+			'title',
+			'questions',
+			'questions__title',
+			'questions__question_type',
+			'questions__response_options',
+			'questions__response_options__title',
+		)
+	)
+	surveys, questions = {}, {}
+	for survey_pk, title, question_pk, q_title, q_type, option_pk, option_title in rows:
+		surveys.setdefault(survey_pk, (title, {}))
+		if question_pk is None:
+			continue
+		question = questions.setdefault(
+			question_pk, QuestionSchema(question_pk, q_title, q_type, {}),
+		)
+		surveys[survey_pk][1][question_pk] = question
+		if option_pk is not None:
+			question.options[option_pk] = option_title
+	return {
+		pk: SurveySchema(pk, title, survey_questions)
+		for pk, (title, survey_questions) in surveys.items()
+	}
@@ -1,17 +1,32 @@
-from typing import List, Union
+from typing import Dict, List, Tuple, Union
+
+from django.db import IntegrityError, models, transaction
 
 from drf_writable_nested.serializers import WritableNestedModelSerializer
 
 from rest_framework import serializers
 from rest_framework.serializers import ValidationError
+from rest_framework.settings import api_settings
 
+from survey.surveys.cache import get_survey_schemas
 from survey.surveys.models import (
 	Question,
+	QueuedSubmission,
 	Response,
 	ResponseOption,
 	Survey,
 	SurveyResponse,
 )
+from survey.surveys.schemas import (
+	AnswerTitles,
+	SurveySchema,
+	check_response_type,
+	get_survey_pk,
+	load_answer_titles,
+	pop_redundant_fields,
+	render_answers,
+)
+from survey.surveys.services import is_valid_uuid4
 
 
 class ResponseOptionSerializer(serializers.ModelSerializer):
@@ -20,7 +35,81 @@ class ResponseOptionSerializer(serializers.ModelSerializer):
 		fields = '__all__'
 
 
+class SchemaRelatedField(serializers.PrimaryKeyRelatedField):
+	"""
+	Resolves pks through the compiled schema of the survey being responded,
+	instead of a query per pk. Pks from elsewhere are still looked up, so
+	that they are reported as unrelated rather than nonexistent.
+	"""
+	# name of the SurveySchema method looking up the instance by pk
+	schema_lookup = None
+
+	def get_from_schema(self, schema, pk: int):
+		return getattr(schema, self.schema_lookup)(pk)
+
+	def to_internal_value(self, data):
+		schema = getattr(self.root, 'survey_schema', None)
+		if schema is not None and self.schema_lookup and isinstance(data, int) and not isinstance(data, bool):
+			if (instance := self.get_from_schema(schema, data)) is not None:
+				return instance
+		return super().to_internal_value(data)
+
+
+class SchemaQuestionField(SchemaRelatedField):
+	schema_lookup = 'get_question'
+
+
+class SchemaResponseOptionField(SchemaRelatedField):
+	schema_lookup = 'get_response_option'
+
+
+class ResponseListSerializer(serializers.ListSerializer):
+	"""
+	Renders answers of survey responses stored as a JSONB document
+	the same way as nested responses.
+	"""
+
+	def get_attribute(self, instance):
+		if getattr(instance, 'answers', None) is not None:
+			return instance
+		return super().get_attribute(instance)
+
+	def to_representation(self, data):
+		if isinstance(data, SurveyResponse):
+			schemas, titles = getattr(self.root, 'answer_titles', None) or load_survey_response_titles([data])
+			return render_answers(data.answers, schemas.get(data.survey_id), titles)
+		return super().to_representation(data)
+
+
+def load_survey_response_titles(survey_responses) -> Tuple[Dict[int, SurveySchema], AnswerTitles]:
+	"""
+	Schemas of the surveys and titles of questions and response options
+	missing from them, for rendering answers of survey responses kept as
+	JSONB documents, in a constant number of queries.
+	"""
+	documents = [survey_response for survey_response in survey_responses if survey_response.answers is not None]
+	schemas = get_survey_schemas(survey_response.survey_id for survey_response in documents)
+	return schemas, load_answer_titles(
+		(survey_response.answers, schemas.get(survey_response.survey_id)) for survey_response in documents
+	)
+
+
+class SurveyResponseListSerializer(serializers.ListSerializer):
+	"""Resolves what JSONB answers of the survey responses refer to once for all of them."""
+
+	def to_representation(self, data):
+		survey_responses = list(data.all() if isinstance(data, models.Manager) else data)
+		self.answer_titles = load_survey_response_titles(survey_responses)
+		return super().to_representation(survey_responses)
+
+
 class ResponseSerializer(serializers.ModelSerializer):
+	question = SchemaQuestionField(queryset=Question.objects.all(), allow_null=True, required=False)
+	response_select = SchemaResponseOptionField(
+		queryset=ResponseOption.objects.all(),
+		many=True,
+		required=False,
+	)
 	question_title = serializers.SerializerMethodField()
 	response_select_titles = serializers.SerializerMethodField()
 
@@ -46,42 +135,13 @@ class ResponseSerializer(serializers.ModelSerializer):
 	def validate(self, data):
 		if (question := data.get('question')) is None:
 			raise ValidationError('Question ID not provided')
-
-		qtype = {
-			'is_sel': (question.question_type == 'select'),
-			'is_selmult': (question.question_type == 'select multiple'),
-			'is_txt': (question.question_type == 'text'),
-		}
-		q_pk, q_title = question.pk, question.title
-
-		if qtype['is_selmult'] and len(data.get('response_select', [])) < 2:
-			raise ValidationError(
-				f'Multiple items should be selected for question {q_pk} "{q_title}"'
-			)
-		elif qtype['is_sel'] and len(data.get('response_select', [])) > 1:
-			raise ValidationError(
-				f'Only one item should be selected for question {q_pk} "{q_title}"'
-			)
-		elif qtype['is_txt'] and not data.get('response_text'):
-			raise ValidationError(
-				f'response_text field is empty for question {q_pk} "{q_title}"'
-			)
-		if ((qtype['is_sel'] or qtype['is_selmult']) and
-				not data.get('response_select')):
-			raise ValidationError(
-				f'response_select field is empty for question {q_pk} "{q_title}"'
-			)
-		self._pop_redundant_fields(data, qtype)
+		check_response_type(question, data)
+		pop_redundant_fields(question, data)
 		return data
 
-	def _pop_redundant_fields(self, data, qtype: dict) -> None:
-		if qtype['is_sel'] or qtype['is_selmult']:
-			data.pop('response_text', None)
-		elif qtype['is_txt']:
-			data.pop('response_select', None)
-
 	class Meta:
 		model = Response
+		list_serializer_class = ResponseListSerializer
 		fields = (
 			'question',
 			'question_title',
@@ -91,6 +151,11 @@ class ResponseSerializer(serializers.ModelSerializer):
 		)
 
 
+class ResponseSearchSerializer(ResponseSerializer):
+	class Meta(ResponseSerializer.Meta):
+		fields = ('pk',) + ResponseSerializer.Meta.fields
+
+
 class QuestionSerializer(WritableNestedModelSerializer):
 	response_options = ResponseOptionSerializer(required=False, many=True)
 	question_type = serializers.ChoiceField(
@@ -189,79 +254,118 @@ class SurveySerializer(WritableNestedModelSerializer):
 class SurveyResponseSerializer(WritableNestedModelSerializer):
 	responses = ResponseSerializer(many=True)
 
+	def to_internal_value(self, data):
+		"""
+		Picks up the compiled schema of the survey first, so that nested
+		questions and response options are resolved and validated against it.
+		"""
+		survey_pk = get_survey_pk(data)
+		self.survey_schema = get_survey_schemas([survey_pk]).get(survey_pk) if survey_pk is not None else None
+		return super().to_internal_value(data)
+
 	def validate(self, data):
-		survey = data.get('survey')
+		if data.get('survey') is None:
+			raise ValidationError('survey ID not provided')
 		responses = data.get('responses', [])
-		self._validate_user_not_already_taken_survey(survey)
-		self._validate_responses_question_equality(responses, survey)
-		self._validate_response_questions(responses, survey)
-		self._validate_response_options(responses)
+		selections = [option for resp in responses for option in resp.get('response_select', [])]
+		self.survey_schema.validate_responses(
+			[
+				{
+					'question': resp['question'].pk,
+					'response_select': [option.pk for option in resp.get('response_select', [])],
+				}
+				for resp in responses
+			],
+			option_titles={option.pk: option.title for option in selections},
+		)
 		return data
 
-	def _validate_user_not_already_taken_survey(self, survey):
-		"""Check if user takes the survey for the first time."""
-		user_id = self.context['request'].COOKIES.get('user_id')
-		if user_id is None:
-			return
-		if SurveyResponse.objects.has_user_already_taken_survey(survey.pk, user_id):
-			raise ValidationError(f'You\'ve already taken survey "{survey}" before')
-
-	def _validate_responses_question_equality(self, responses, survey) -> None:
-		"""Check if responses count equal to questions count."""
-		try:
-			questions = survey.questions
-		except AttributeError:
-			raise ValidationError('survey ID not provided')
-		if len(responses) < questions.count():
-			raise ValidationError(
-				'You have not answered all the survey questions'
-			)
-		elif len(responses) > questions.count():
-			raise ValidationError(
-				'You have answered some questions more than once'
-			)
-
-	def _validate_response_questions(self, responses, survey) -> None:
-		"""Check if all the questions are related to the survey."""
-		responses_questions_ids = {resp.get('question').pk for resp in responses}
-		try:
-			questions = survey.questions.all()
-		except AttributeError:
-			raise ValidationError('Provide questions to which you respond.')
-		survey_questions_ids = {q.pk for q in questions}
-
-		if responses_questions_ids < survey_questions_ids:
-			invalid_ids = survey_questions_ids - responses_questions_ids
-			raise ValidationError(
-				f'You haven\'t asnswered questions {invalid_ids}'
-			)
-		if responses_questions_ids != survey_questions_ids:
-			invalid_ids = responses_questions_ids - survey_questions_ids
-			raise ValidationError(
-				f'These questions are not related to the survey: {invalid_ids}'
-			)
-
-	def _validate_response_options(self, responses: list) -> None:
+	def create(self, validated_data):
 		"""
-		Check if all selected response options are related to the question.
+		Inserts the survey response with its responses in bulk, or as a single
+		row in the JSONB storage mode, instead of saving every nested response
+		and relation one by one.
+		Relies on the (user_id, survey) unique constraint to check if user
+		takes the survey for the first time, which is race-free and saves
+		a query per submission.
 		"""
-		for resp in responses:
-			selections = resp.get('response_select')
-			if selections is not None:
-				valid_question = resp.get('question')
-				for selection in selections:
-					if selection.question.pk != valid_question.pk:
-						valid_resp_options = valid_question.response_options.all()
-						valid_options = ', '.join(
-							[f'{r.pk} "{r.title}"' for r in valid_resp_options]
-						)
-						raise ValidationError(
-							f'Response option {selection.pk} "{selection.title}" '
-							'is unrelated to the question '
-							f'{valid_question.pk} "{valid_question.title}". '
-							f'Valid options are: {valid_options}'
-						)
+		survey, user_id = validated_data['survey'], validated_data['user_id']
+		submission = {
+			'user_id': user_id,
+			'survey': survey.pk,
+			'responses': [
+				{
+					'question': resp['question'].pk,
+					'response_text': resp.get('response_text', ''),
+					'response_select': [option.pk for option in resp.get('response_select', [])],
+				}
+				for resp in validated_data['responses']
+			],
+		}
+		try:
+			with transaction.atomic():
+				survey_response, = SurveyResponse.objects.bulk_create_submissions([submission])
+		except IntegrityError:
+			if not SurveyResponse.objects.has_user_already_taken_survey(survey.pk, user_id):
+				raise
+			raise ValidationError({
+				api_settings.NON_FIELD_ERRORS_KEY: [f'You\'ve already taken survey "{survey}" before'],
+			})
+		if survey_response.answers is not None:
+			return survey_response
+		return SurveyResponse.objects.with_responses().get(pk=survey_response.pk)
 
 	class Meta:
 		model = SurveyResponse
+		list_serializer_class = SurveyResponseListSerializer
 		fields = ('pk', 'user_id', 'survey', 'responses')
+
+
+class ResponseSubmissionSerializer(serializers.Serializer):
+	question = serializers.IntegerField()
+	response_text = serializers.CharField(max_length=200, required=False, allow_blank=True)
+	response_select = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+	def to_internal_value(self, data):
+		"""Converts response_select type int to list."""
+		if isinstance(data, dict) and isinstance(data.get('response_select'), int):
+			data = {**data, 'response_select': [data['response_select']]}
+		return super().to_internal_value(data)
+
+
+class SurveyResponseSubmissionSerializer(serializers.Serializer):
+	"""
+	Survey response validated against compiled survey schemas passed in
+	the context, so that a batch of submissions is validated without queries.
+	"""
+	user_id = serializers.CharField(max_length=100)
+	survey = serializers.IntegerField()
+	responses = ResponseSubmissionSerializer(many=True)
+
+	def validate_user_id(self, user_id: str) -> str:
+		if not is_valid_uuid4(user_id):
+			raise ValidationError('user_id should be a valid uuid4')
+		return user_id
+
+	def validate(self, data):
+		if (schema := self.context['schemas'].get(data['survey'])) is None:
+			raise ValidationError({
+				'survey': [f'Invalid pk "{data["survey"]}" - object does not exist.'],
+			})
+		errors = []
+		for response in data['responses']:
+			try:
+				schema.validate_response(response)
+				errors.append({})
+			except ValidationError as exc:
+				errors.append({api_settings.NON_FIELD_ERRORS_KEY: exc.detail})
+		if any(errors):
+			raise ValidationError({'responses': errors})
+		schema.validate_responses(data['responses'])
+		return data
+
+
+class QueuedSubmissionSerializer(serializers.ModelSerializer):
+	class Meta:
+		model = QueuedSubmission
+		fields = ('receipt', 'status', 'result', 'created_at', 'processed_at')
@@ -0,0 +1,88 @@
+from typing import Iterable
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_model_version, bump_survey_version
+from .models import Question, ResponseOption, Survey
+
+
+def _touch(model, pks: Iterable[int]) -> None:
+	"""Bumps updated_at, which serves conditional GET validators."""
+	model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+def _surveys_changed(survey_ids: set) -> None:
+	"""Nested question or response option of the surveys has changed."""
+	survey_ids -= {None}
+	_touch(Survey, survey_ids)
+	for survey_id in survey_ids:
+		bump_survey_version(survey_id)
+
+
+@receiver(post_save, sender=Survey)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Survey)
+@receiver(post_delete, sender=Question)
+def listed_model_changed(sender, **kwargs):
+	"""A row may have left lists served with conditional GET validators."""
+	bump_model_version(sender)
+
+
+@receiver(post_save, sender=Survey)
+def survey_saved(sender, instance, **kwargs):
+	bump_survey_version(instance.pk)
+	Survey.objects.filter(pk=instance.pk).update_search_vector()
+	# survey title is a part of the question representation
+	Question.objects.filter(survey=instance).update(updated_at=instance.updated_at)
+
+
+@receiver(pre_delete, sender=Survey)
+def survey_deleting(sender, instance, **kwargs):
+	Question.objects.filter(survey=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Survey)
+def survey_deleted(sender, instance, **kwargs):
+	bump_survey_version(instance.pk)
+
+
+@receiver(pre_save, sender=Question)
+def remember_previous_survey(sender, instance, **kwargs):
+	"""Keeps the survey the question belonged to, in case it gets moved."""
+	if instance.pk is not None:
+		instance._previous_survey_id = (
+			Question.objects
+			.filter(pk=instance.pk)
+			.values_list('survey_id', flat=True)
+			.first()
+		)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+	_surveys_changed({instance.survey_id, getattr(instance, '_previous_survey_id', None)})
+
+
+@receiver(pre_save, sender=ResponseOption)
+def remember_previous_question(sender, instance, **kwargs):
+	"""Keeps the question the option belonged to, in case it gets moved."""
+	if instance.pk is not None:
+		instance._previous_question_id = (
+			ResponseOption.objects
+			.filter(pk=instance.pk)
+			.values_list('question_id', flat=True)
+			.first()
+		)
+
+
+@receiver(post_save, sender=ResponseOption)
+@receiver(post_delete, sender=ResponseOption)
+def response_option_changed(sender, instance, **kwargs):
+	question_ids = {instance.question_id, getattr(instance, '_previous_question_id', None)} - {None}
+	_touch(Question, question_ids)
+	_surveys_changed(set(
+		Question.objects.filter(pk__in=question_ids).values_list('survey_id', flat=True),
+	))
@@ -0,0 +1,111 @@
+from typing import Dict, List
+
+from django.db import IntegrityError, transaction
+
+from rest_framework import status
+from rest_framework.settings import api_settings
+
+from .cache import get_survey_schemas
+from .models import SurveyResponse
+from .schemas import SurveySchema, get_survey_pk
+from .serializers import SurveyResponseSubmissionSerializer
+
+
+def submit_survey_responses(items: list) -> List[dict]:
+	"""
+	Validates a batch of survey responses and inserts the valid ones in
+	a single transaction. Returns a result per item, in the same order:
+	either pk of the created survey response, validation errors or, for
+	submissions the database still refuses, a failure.
+	"""
+	schemas = get_survey_schemas(
+		pk for pk in map(get_survey_pk, items) if pk is not None
+	)
+	results = {}
+	valid = {}
+	for index, item in enumerate(items):
+		serializer = SurveyResponseSubmissionSerializer(data=item, context={'schemas': schemas})
+		if serializer.is_valid():
+			valid[index] = serializer.validated_data
+		else:
+			results[index] = _rejected(index, serializer.errors)
+
+	created = {}
+	# a concurrent submission may take a survey after the check, retry once
+	for attempt in range(2 if valid else 0):
+		for index in _get_already_taken(valid):
+			schema = schemas[valid.pop(index)['survey']]
+			results[index] = _rejected(index, _already_taken_errors(schema))
+		try:
+			with transaction.atomic():
+				created = dict(zip(valid, SurveyResponse.objects.bulk_create_submissions(list(valid.values()))))
+			break
+		except IntegrityError:
+			if attempt:
+				created = _create_one_by_one(valid, results)
+
+	for index, survey_response in created.items():
+		results[index] = {
+			'index': index,
+			'status': status.HTTP_201_CREATED,
+			'pk': survey_response.pk,
+			'user_id': survey_response.user_id,
+		}
+	return [results[index] for index in range(len(items))]
+
+
+def _create_one_by_one(submissions: Dict[int, dict], results: Dict[int, dict]) -> Dict[int, SurveyResponse]:
+	"""
+	Inserts submissions one at a time, each in its own savepoint, once
+	the batch keeps failing, so that a submission violating a constraint
+	doesn't fail the others. Submissions that still fail are recorded in
+	results as failed.
+	"""
+	created = {}
+	for index, submission in submissions.items():
+		try:
+			with transaction.atomic():
+				created[index], = SurveyResponse.objects.bulk_create_submissions([submission])
+		except IntegrityError:
+			results[index] = _failed(index)
+	return created
+
+
+def _get_already_taken(submissions: Dict[int, dict]) -> List[int]:
+	"""
+	Returns indexes of submissions for surveys already taken by the user,
+	either before or earlier in the same batch, looked up in one query.
+	"""
+	if not submissions:
+		return []
+	taken = set(
+		SurveyResponse.objects
+		.filter(
+			user_id__in={submission['user_id'] for submission in submissions.values()},
+			survey__in={submission['survey'] for submission in submissions.values()},
+		)
+		.values_list('user_id', 'survey_id')
+	)
+	already_taken = []
+	for index, submission in submissions.items():
+		key = (submission['user_id'], submission['survey'])
+		if key in taken:
+			already_taken.append(index)
+		taken.add(key)
+	return already_taken
+
+
+def _already_taken_errors(schema: SurveySchema) -> dict:
+	return {api_settings.NON_FIELD_ERRORS_KEY: [f'You\'ve already taken survey "{schema}" before']}
+
+
+def _rejected(index: int, errors: dict) -> dict:
+	return {'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': errors}
+
+
+def _failed(index: int) -> dict:
+	return {
+		'index': index,
+		'status': status.HTTP_409_CONFLICT,
+		'errors': {api_settings.NON_FIELD_ERRORS_KEY: ['The survey response could not be saved']},
+	}
@@ -0,0 +1,69 @@
+from io import BytesIO, StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+import numpy as np
+
+import pytest
+
+from survey.surveys.matrices import load_answer_matrix
+from survey.surveys.models import SurveyResponse
+
+from .utils import CustomSurveyResponse, create_survey
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def answered_survey(api_admin, api_user, surv_active, settings):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    # two, one + three
+    in_tables = api_user.post('/api/v1/survey-responses/', data=custom_sr.get_valid_sr())
+    settings.SURVEY_RESPONSES_STORAGE = SurveyResponse.JSONB
+    api_user.cookies.clear()
+    # one, two + three
+    in_jsonb = api_user.post('/api/v1/survey-responses/', data=custom_sr.get_another_valid_sr())
+    return custom_sr, [in_tables['pk'], in_jsonb['pk']]
+
+
+def test_export_answer_matrix(answered_survey, tmp_path, settings):
+    settings.SURVEY_EXPORT_CHUNK_SIZE = 1
+    custom_sr, survey_response_pks = answered_survey
+    out = StringIO()
+    call_command('export_answer_matrix', custom_sr.survey_pk, f'--output-dir={tmp_path}', stdout=out)
+    assert 'Wrote 2 survey responses x 5 response options' in out.getvalue()
+
+    loaded = load_answer_matrix(tmp_path)
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.respondents.tolist() == survey_response_pks
+    assert loaded.options.tolist() == custom_sr.Rid.sel_pks + custom_sr.Rid.sel_mult_pks
+    assert loaded.questions.tolist() == [custom_sr.Qid.sel_pk] * 2 + [custom_sr.Qid.selmult_pk] * 3
+    assert loaded.matrix.tolist() == [
+        [0, 1, 1, 0, 1],
+        [1, 0, 0, 1, 1],
+    ]
+
+
+def test_export_answer_matrix_without_respondents(tmp_path):
+    survey = create_survey(2)
+    call_command('export_answer_matrix', survey.pk, f'--output-dir={tmp_path}', stdout=StringIO())
+    loaded = load_answer_matrix(tmp_path)
+    assert loaded.matrix.shape == (0, 6)
+    assert loaded.respondents.shape == (0,)
+    with pytest.raises(CommandError):
+        call_command('export_answer_matrix', 0, f'--output-dir={tmp_path}', stdout=StringIO())
+
+
+def test_download_answer_matrix(api_admin, api_user, answered_survey):
+    custom_sr, survey_response_pks = answered_survey
+    url = f'/api/v1/surveys/{custom_sr.survey_pk}/matrix/'
+    response = api_admin.get(url, as_response=True)
+    assert response.status_code == 200
+    assert response['Content-Disposition'] == f'attachment; filename="survey-{custom_sr.survey_pk}-answers.npz"'
+    with np.load(BytesIO(b''.join(response.streaming_content))) as archive:
+        assert archive['respondents'].tolist() == survey_response_pks
+        assert archive['matrix'].sum(axis=1).tolist() == [3, 3]
+    api_user.get(url, expected_status_code=401)
@@ -0,0 +1,122 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+
+from survey.surveys.models import Question, Response, SurveyResponse
+
+from .utils import CustomSurveyResponse, create_survey, create_survey_responses, get_survey_response_data
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def jsonb_storage(settings):
+    settings.SURVEY_RESPONSES_STORAGE = SurveyResponse.JSONB
+
+
+def by_question(survey_response):
+    return sorted(survey_response['responses'], key=lambda response: response['question'])
+
+
+def inserts(queries):
+    return sum(query['sql'].lstrip().upper().startswith('INSERT') for query in queries)
+
+
+def test_jsonb_submission_is_a_single_survey_response_insert(api_admin, api_user, surv_active, jsonb_storage):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    survey_response = CustomSurveyResponse(admin_got['pk']).get_valid_sr()
+    with CaptureQueriesContext(connection) as submission:
+        got = api_user.post('/api/v1/survey-responses/', data=survey_response)
+
+    # the survey response, then the survey, option and text answer tally upserts
+    assert inserts(submission) == 4
+    assert not Response.objects.exists()
+    assert len(SurveyResponse.objects.get(pk=got['pk']).answers) == 3
+
+
+def test_jsonb_representation_matches_tables(api_admin, api_user, surv_active, settings):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    in_tables = api_user.post('/api/v1/survey-responses/', data=custom_sr.get_valid_sr())
+
+    settings.SURVEY_RESPONSES_STORAGE = SurveyResponse.JSONB
+    api_user.cookies.clear()
+    in_jsonb = api_user.post('/api/v1/survey-responses/', data=custom_sr.get_valid_sr())
+
+    assert by_question(in_jsonb) == by_question(in_tables)
+    assert by_question(api_admin.get(f'/api/v1/survey-responses/{in_jsonb["pk"]}/')) == by_question(in_tables)
+
+
+def test_jsonb_list_needs_no_joins(api_admin, jsonb_storage, django_assert_num_queries):
+    survey = create_survey(10)
+    items = [get_survey_response_data(survey) for _ in range(3)]
+    api_admin.post('/api/v1/survey-responses/bulk/', data=items, expected_status_code=200)
+    # token, count estimate, count, survey responses; the survey schema is cached
+    with django_assert_num_queries(4) as queries:
+        got = api_admin.get('/api/v1/survey-responses/')
+    assert not any('JOIN' in query['sql'] for query in queries if 'surveys_' in query['sql'])
+    assert len(got['results'][0]['responses']) == 10
+    assert got['results'][0]['responses'][0]['response_select_titles'] == ['Option 0']
+
+
+def test_jsonb_deleted_question(api_admin, jsonb_storage):
+    survey = create_survey(2)
+    got = api_admin.post(
+        '/api/v1/survey-responses/bulk/',
+        data=[get_survey_response_data(survey)],
+        expected_status_code=200,
+    )
+    question = survey.questions.first()
+    api_admin.delete(f'/api/v1/questions/{question.pk}/')
+
+    got = api_admin.get(f'/api/v1/survey-responses/{got["results"][0]["pk"]}/')
+    deleted, = [response for response in got['responses'] if response['question'] == question.pk]
+    assert deleted['question_title'] == 'deleted'
+
+
+def test_jsonb_bulk_submission(api_user, jsonb_storage):
+    survey = create_survey(5)
+    items = [get_survey_response_data(survey) for _ in range(20)]
+    with CaptureQueriesContext(connection) as submission:
+        api_user.post('/api/v1/survey-responses/bulk/', data=items, expected_status_code=200)
+    # survey responses, then the survey and option tally upserts
+    assert inserts(submission) == 3
+    assert SurveyResponse.objects.filter(answers__contains={
+        str(question.pk): [question.response_options.all()[0].pk]
+        for question in Question.objects.filter(survey=survey)[:1]
+    }).count() == 20
+
+
+def test_convert_survey_responses(api_admin):
+    survey = create_survey(4)
+    create_survey_responses(survey, 5)
+    before = api_admin.get('/api/v1/survey-responses/')
+
+    out = StringIO()
+    call_command('convert_survey_responses', '--batch-size=2', stdout=out)
+
+    assert 'Converted 5 survey responses' in out.getvalue()
+    assert not Response.objects.exists()
+    assert not SurveyResponse.objects.filter(answers__isnull=True).exists()
+    after = api_admin.get('/api/v1/survey-responses/')
+    assert [by_question(sr) for sr in after['results']] == [by_question(sr) for sr in before['results']]
+
+
+def test_jsonb_list_of_deleted_survey_matches_tables(api_admin, settings, django_assert_num_queries):
+    survey = create_survey(3)
+    create_survey_responses(survey, 10)
+    survey.delete()
+    before = api_admin.get('/api/v1/survey-responses/')
+    call_command('convert_survey_responses', stdout=StringIO())
+
+    settings.SURVEY_RESPONSES_STORAGE = SurveyResponse.JSONB
+    # token, count estimate, count, survey responses, question titles, option titles
+    with django_assert_num_queries(6):
+        after = api_admin.get('/api/v1/survey-responses/')
+    assert [by_question(sr) for sr in after['results']] == [by_question(sr) for sr in before['results']]
+    assert after['results'][0]['responses'][0]['response_select_titles'] == ['Option 0']
@@ -0,0 +1,97 @@
+import uuid
+
+import pytest
+
+from survey.surveys.models import Response, SurveyResponse
+
+from .utils import CustomSurveyResponse, create_survey, get_survey_response_data as submission
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_bulk_creates_survey_responses(api_user):
+    survey = create_survey(3)
+    items = [submission(survey) for _ in range(5)]
+    got = api_user.post('/api/v1/survey-responses/bulk/', data=items, expected_status_code=200)
+
+    assert [result['status'] for result in got['results']] == [201] * 5
+    assert [result['user_id'] for result in got['results']] == [item['user_id'] for item in items]
+    survey_response = SurveyResponse.objects.get(pk=got['results'][0]['pk'])
+    assert survey_response.responses.count() == 3
+    assert all(response.response_select.count() == 1 for response in survey_response.responses.all())
+
+
+def test_bulk_reports_errors_per_item(api_admin, api_user, surv_active):
+    survey = create_survey(2)
+    other_survey = api_admin.post('/api/v1/surveys/', data=surv_active)
+    invalid = CustomSurveyResponse(other_survey['pk']).get_invalid_sr_mutselect_for_select()
+    invalid['user_id'] = str(uuid.uuid4())
+    items = [
+        submission(survey),
+        invalid,
+        {**submission(survey), 'user_id': 'not-a-uuid'},
+        {**submission(survey), 'survey': 0},
+        {**submission(survey), 'responses': submission(survey)['responses'][:1]},
+    ]
+    got = api_user.post('/api/v1/survey-responses/bulk/', data=items, expected_status_code=200)
+
+    assert [result['status'] for result in got['results']] == [201, 400, 400, 400, 400]
+    assert [result['index'] for result in got['results']] == list(range(5))
+    assert 'Only one item should be selected' in str(got['results'][1]['errors'])
+    assert 'user_id' in got['results'][2]['errors']
+    assert got['results'][3]['errors'] == {'survey': ['Invalid pk "0" - object does not exist.']}
+    assert got['results'][4]['errors'] == {
+        'non_field_errors': ['You have not answered all the survey questions'],
+    }
+    assert SurveyResponse.objects.count() == 1
+
+
+def test_bulk_user_cant_take_survey_twice(api_user):
+    survey = create_survey(2)
+    first = submission(survey)
+    api_user.post('/api/v1/survey-responses/bulk/', data=[first], expected_status_code=200)
+    again = submission(survey, user_id=first['user_id'])
+    fresh = submission(survey)
+
+    got = api_user.post(
+        '/api/v1/survey-responses/bulk/',
+        data=[again, fresh, fresh],
+        expected_status_code=200,
+    )
+
+    assert [result['status'] for result in got['results']] == [400, 201, 400]
+    assert got['results'][0]['errors'] == {
+        'non_field_errors': ['You\'ve already taken survey "A Survey" before'],
+    }
+    assert SurveyResponse.objects.count() == 2
+    assert Response.objects.count() == 4
+
+
+def test_bulk_rejects_non_list(api_user):
+    survey = create_survey(1)
+    api_user.post('/api/v1/survey-responses/bulk/', data=submission(survey), expected_status_code=400)
+
+
+def test_bulk_rejects_too_many_items(api_user, settings):
+    settings.SURVEY_RESPONSES_BULK_LIMIT = 2
+    survey = create_survey(1)
+    items = [submission(survey) for _ in range(3)]
+    api_user.post('/api/v1/survey-responses/bulk/', data=items, expected_status_code=400)
+    assert not SurveyResponse.objects.exists()
+
+
+@pytest.mark.parametrize('num_items', [1, 50])
+def test_bulk_queries_dont_grow_with_items(api_user, django_assert_num_queries, num_items):
+    """
+    Replaying N submissions one POST at a time costs N times the queries of
+    one submission; a bulk submission costs the same for any N: 1 to load
+    survey schemas, 1 to look up taken surveys, 4 inserts, 2 result tally
+    upserts and a savepoint with its release.
+    """
+    survey = create_survey(10)
+    items = [submission(survey) for _ in range(num_items)]
+    with django_assert_num_queries(10):
+        api_user.post('/api/v1/survey-responses/bulk/', data=items, expected_status_code=200)
+    assert SurveyResponse.objects.count() == num_items
+    assert Response.objects.count() == num_items * 10
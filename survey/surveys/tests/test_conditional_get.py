@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from django.utils.http import http_date
+
+import pytest
+
+from survey.surveys.models import ResponseOption, Survey
+
+from .utils import create_survey
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_survey_detail_not_modified(api_user, django_assert_num_queries):
+    survey = create_survey(5)
+    got = api_user.get(f'/api/v1/surveys/{survey.pk}/', as_response=True)
+    assert got['Last-Modified']
+    # validators only
+    with django_assert_num_queries(1):
+        api_user.get(
+            f'/api/v1/surveys/{survey.pk}/',
+            HTTP_IF_NONE_MATCH=got['ETag'],
+            expected_status_code=304,
+        )
+
+
+def test_survey_detail_modified_since(api_user):
+    survey = create_survey(1)
+    since = http_date((datetime.now(tz=timezone.utc) + timedelta(minutes=1)).timestamp())
+    api_user.get(f'/api/v1/surveys/{survey.pk}/', HTTP_IF_MODIFIED_SINCE=since, expected_status_code=304)
+    since = http_date((datetime.now(tz=timezone.utc) - timedelta(minutes=1)).timestamp())
+    api_user.get(f'/api/v1/surveys/{survey.pk}/', HTTP_IF_MODIFIED_SINCE=since)
+
+
+def test_survey_detail_modified_by_response_option(api_user):
+    survey = create_survey(1)
+    etag = api_user.get(f'/api/v1/surveys/{survey.pk}/', as_response=True)['ETag']
+    option = ResponseOption.objects.filter(question__survey=survey).first()
+    option.title = 'Changed'
+    option.save()
+    got = api_user.get(f'/api/v1/surveys/{survey.pk}/', HTTP_IF_NONE_MATCH=etag, as_response=True)
+    assert got.status_code == 200
+    assert got['ETag'] != etag
+
+
+def test_missing_survey_not_found(api_user):
+    api_user.get('/api/v1/surveys/0/', HTTP_IF_NONE_MATCH='W/"0-0"', expected_status_code=404)
+
+
+@pytest.mark.parametrize('url', ['/api/v1/surveys/abc/', '/api/v1/questions/abc/'])
+def test_malformed_pk_not_found(api_admin, url):
+    api_admin.get(url, expected_status_code=404)
+
+
+def test_surveys_list_not_modified(api_user):
+    create_survey(1, title='Survey 1')
+    etag = api_user.get('/api/v1/surveys/', as_response=True)['ETag']
+    api_user.get('/api/v1/surveys/', HTTP_IF_NONE_MATCH=etag, expected_status_code=304)
+
+
+def test_surveys_list_modified_by_deletion(api_admin, django_assert_num_queries):
+    survey = create_survey(1, title='Survey 1')
+    create_survey(1, title='Survey 2')
+    etag = api_admin.get('/api/v1/surveys/', as_response=True)['ETag']
+    # token, validators
+    with django_assert_num_queries(2):
+        api_admin.get('/api/v1/surveys/', HTTP_IF_NONE_MATCH=etag, expected_status_code=304)
+    # not the latest updated survey, which leaves the latest updated_at as it was
+    survey.delete()
+    got = api_admin.get('/api/v1/surveys/', HTTP_IF_NONE_MATCH=etag, as_response=True)
+    assert got.status_code == 200
+    api_admin.get('/api/v1/surveys/', HTTP_IF_NONE_MATCH=got['ETag'], expected_status_code=304)
+
+
+def test_surveys_list_modified_by_survey_end(api_user):
+    survey = create_survey(1, title='Survey 1')
+    create_survey(1, title='Survey 2')
+    Survey.objects.filter(pk=survey.pk).update(end_date=timezone.now() + timedelta(minutes=1))
+    etag = api_user.get('/api/v1/surveys/', as_response=True)['ETag']
+    # as if the minute has passed
+    Survey.objects.filter(pk=survey.pk).update(end_date=timezone.now() - timedelta(minutes=1))
+    got = api_user.get('/api/v1/surveys/', HTTP_IF_NONE_MATCH=etag, as_response=True)
+    assert got.status_code == 200
+    assert [item['title'] for item in got.json()['results']] == ['Survey 2']
+
+
+def test_questions_list_modified_by_survey_title(api_admin):
+    survey = create_survey(2)
+    etag = api_admin.get('/api/v1/questions/', as_response=True)['ETag']
+    api_admin.get('/api/v1/questions/', HTTP_IF_NONE_MATCH=etag, expected_status_code=304)
+    survey.title = 'Changed'
+    survey.save()
+    got = api_admin.get('/api/v1/questions/', HTTP_IF_NONE_MATCH=etag)
+    assert got['results'][0]['survey_title'] == 'Changed'
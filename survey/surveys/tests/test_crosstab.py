@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+import pytest
+
+from survey.surveys.models import SurveyResponse
+
+from .utils import CustomSurveyResponse
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_crosstab_of_select_and_select_multiple(api_admin, api_user, surv_active, settings):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    sel, selmult = custom_sr.Qid.sel_pk, custom_sr.Qid.selmult_pk
+    # two, one + three
+    api_user.post('/api/v1/survey-responses/', data=custom_sr.get_valid_sr())
+    settings.SURVEY_RESPONSES_STORAGE = SurveyResponse.JSONB
+    # one, two + three; answers kept as a JSONB document
+    api_user.cookies.clear()
+    api_user.post('/api/v1/survey-responses/', data=custom_sr.get_another_valid_sr())
+    api_user.cookies.clear()
+    api_user.post('/api/v1/survey-responses/', data=custom_sr.get_another_valid_sr())
+
+    got = api_admin.get(f'/api/v1/surveys/{admin_got["pk"]}/crosstab/?q1={sel}&q2={selmult}')
+    assert got['respondents'] == 3
+    assert got['rows']['question'] == sel
+    assert [option['title'] for option in got['rows']['options']] == ['one', 'two']
+    assert [option['title'] for option in got['columns']['options']] == ['one', 'two', 'three']
+    assert got['counts'] == [
+        [0, 2, 2],
+        [1, 0, 1],
+    ]
+    assert got['row_totals'] == [2, 1]
+    assert got['column_totals'] == [1, 2, 3]
+    assert got['row_percentages'] == [
+        [0.0, 100.0, 100.0],
+        [100.0, 0.0, 100.0],
+    ]
+    assert got['column_percentages'] == [
+        [0.0, 100.0, 66.67],
+        [100.0, 0.0, 33.33],
+    ]
+
+
+def test_crosstab_without_respondents(api_admin, surv_active):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    url = f'/api/v1/surveys/{admin_got["pk"]}/crosstab/?q1={custom_sr.Qid.selmult_pk}&q2={custom_sr.Qid.sel_pk}'
+    got = api_admin.get(url)
+    assert got['respondents'] == 0
+    assert got['counts'] == got['row_percentages'] == [[0, 0]] * 3
+
+
+def test_crosstab_takes_select_questions_of_the_survey(api_admin, api_user, surv_active):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    url = f'/api/v1/surveys/{admin_got["pk"]}/crosstab/'
+    got = api_admin.get(f'{url}?q1={custom_sr.Qid.txt_pk}&q2=0', expected_status_code=400)
+    assert set(got) == {'q1', 'q2'}
+    api_admin.get(f'{url}?q1={custom_sr.Qid.sel_pk}', expected_status_code=400)
+    api_user.get(f'{url}?q1={custom_sr.Qid.sel_pk}&q2={custom_sr.Qid.sel_pk}', expected_status_code=401)
+
+
+def test_crosstab_follows_new_respondents(api_admin, api_user, surv_active, django_assert_num_queries):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    url = f'/api/v1/surveys/{admin_got["pk"]}/crosstab/?q1={custom_sr.Qid.sel_pk}&q2={custom_sr.Qid.sel_pk}'
+    api_user.post('/api/v1/survey-responses/', data=custom_sr.get_valid_sr())
+    assert api_admin.get(url)['counts'] == [[0, 0], [0, 1]]
+    # token, respondents; selections are kept in memory
+    with django_assert_num_queries(2):
+        api_admin.get(url)
+
+    api_user.cookies.clear()
+    api_user.post('/api/v1/survey-responses/', data=custom_sr.get_another_valid_sr())
+    # token, new respondents only
+    with django_assert_num_queries(2):
+        assert api_admin.get(url)['counts'] == [[1, 0], [0, 1]]
+
+
+def test_crosstab_reloaded_after_deletions(api_admin, api_user, surv_active):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    url = f'/api/v1/surveys/{admin_got["pk"]}/crosstab/?q1={custom_sr.Qid.sel_pk}&q2={custom_sr.Qid.sel_pk}'
+    first = api_user.post('/api/v1/survey-responses/', data=custom_sr.get_valid_sr())
+    api_user.cookies.clear()
+    api_user.post('/api/v1/survey-responses/', data=custom_sr.get_another_valid_sr())
+    assert api_admin.get(url)['counts'] == [[1, 0], [0, 1]]
+
+    SurveyResponse.objects.filter(pk=first['pk']).delete()
+    call_command('rebuild_result_tallies', stdout=StringIO())
+    assert api_admin.get(url)['counts'] == [[1, 0], [0, 0]]
+
+
+def test_crosstab_skips_text_answers_to_select_questions(api_admin, surv_active):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    sel, selmult = custom_sr.Qid.sel_pk, custom_sr.Qid.selmult_pk
+    SurveyResponse.objects.create(survey_id=admin_got['pk'], user_id='user', answers={
+        str(custom_sr.Qid.txt_pk): 'text', str(sel): '', str(selmult): custom_sr.Rid.sel_mult_pks[:2],
+    })
+    got = api_admin.get(f'/api/v1/surveys/{admin_got["pk"]}/crosstab/?q1={selmult}&q2={selmult}')
+    assert got['respondents'] == 1
+    got = api_admin.get(f'/api/v1/surveys/{admin_got["pk"]}/crosstab/?q1={sel}&q2={selmult}')
+    assert got['respondents'] == 0
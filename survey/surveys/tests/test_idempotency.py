@@ -0,0 +1,152 @@
+import hashlib
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+import pytest
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from survey.surveys.idempotency import scope_key
+from survey.surveys.models import IdempotencyKey, SurveyResponse
+from survey.surveys.serializers import SurveyResponseSerializer
+
+from .utils import CustomSurveyResponse, create_survey, get_survey_response_data
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+def submit(data, key, client=None):
+    return (client or APIClient()).post(
+        '/api/v1/survey-responses/',
+        data=data,
+        format='json',
+        HTTP_IDEMPOTENCY_KEY=key,
+    )
+
+
+def stored_key(key):
+    """Key stored for submissions sent without a user_id cookie."""
+    return scope_key(APIRequestFactory().post('/api/v1/survey-responses/'), key)
+
+
+def test_retry_is_replayed(django_assert_num_queries):
+    survey = create_survey(3)
+    data = {'survey': survey.pk, 'responses': get_survey_response_data(survey)['responses']}
+    first = submit(data, 'key-1')
+    with django_assert_num_queries(1):
+        retry = submit(data, 'key-1')
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.cookies['user_id'].value == first.cookies['user_id'].value == first.json()['user_id']
+    assert SurveyResponse.objects.count() == 1
+
+    assert submit(data, 'key-2').status_code == 201
+    assert SurveyResponse.objects.count() == 2
+
+
+def test_rejection_is_replayed(api_admin, surv_active, django_assert_num_queries):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    data = CustomSurveyResponse(admin_got['pk']).get_invalid_sr_responses_lt_questions()
+    first = submit(data, 'key')
+    with django_assert_num_queries(1):
+        retry = submit(data, 'key')
+    assert first.status_code == retry.status_code == 400
+    assert retry.json() == first.json()
+
+
+def test_retry_while_processing_conflicts():
+    survey = create_survey(1)
+    data = get_survey_response_data(survey)
+    IdempotencyKey.objects.reserve(
+        stored_key('key'),
+        hashlib.sha256(JSONRenderer().render(data)).hexdigest(),
+        timeout=60,
+    )
+    response = submit(data, 'key')
+    assert response.status_code == 409
+    assert not SurveyResponse.objects.exists()
+
+
+def test_expired_key_is_taken_over():
+    survey = create_survey(1)
+    data = {'survey': survey.pk, 'responses': get_survey_response_data(survey)['responses']}
+    submit(data, 'key')
+    IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+    assert submit(data, 'key').status_code == 201
+    assert SurveyResponse.objects.count() == 2
+
+
+def test_server_error_releases_key(monkeypatch):
+    survey = create_survey(1)
+    data = {'survey': survey.pk, 'responses': get_survey_response_data(survey)['responses']}
+
+    def fail(*args, **kwargs):
+        raise RuntimeError
+    monkeypatch.setattr(SurveyResponseSerializer, 'create', fail)
+    with pytest.raises(RuntimeError):
+        submit(data, 'key')
+    assert not IdempotencyKey.objects.exists()
+
+
+def test_key_reused_with_another_body_rejected():
+    survey = create_survey(2)
+    data = {'survey': survey.pk, 'responses': get_survey_response_data(survey)['responses']}
+    submit(data, 'key')
+    data['responses'][0]['response_select'] = data['responses'][0]['response_select'] + 1
+    response = submit(data, 'key')
+    assert response.status_code == 422
+    assert SurveyResponse.objects.count() == 1
+
+
+def test_key_scoped_to_endpoint():
+    survey = create_survey(1)
+    items = [get_survey_response_data(survey)]
+    assert submit(items[0], 'key').status_code == 201
+    response = APIClient().post('/api/v1/survey-responses/bulk/', data=items, format='json', HTTP_IDEMPOTENCY_KEY='key')
+    assert response.status_code == 200
+    assert 'results' in response.json()
+
+
+def test_key_scoped_to_user_id_cookie():
+    survey = create_survey(1)
+    data = {'survey': survey.pk, 'responses': get_survey_response_data(survey)['responses']}
+    first = submit(data, 'key')
+    client = APIClient()
+    client.cookies['user_id'] = '4b5c7b1e-6b9d-4b6b-9a3a-0a6f5f5d8e1c'
+    other = submit(data, 'key', client)
+    assert other.status_code == 201
+    assert other.json()['user_id'] != first.json()['user_id']
+    assert SurveyResponse.objects.count() == 2
+
+
+def test_invalid_key():
+    survey = create_survey(1)
+    assert submit(get_survey_response_data(survey), 'k' * 256).status_code == 400
+
+
+def test_bulk_retry_is_replayed():
+    survey = create_survey(2)
+    items = [get_survey_response_data(survey) for _ in range(3)]
+    client = APIClient()
+    first = client.post('/api/v1/survey-responses/bulk/', data=items, format='json', HTTP_IDEMPOTENCY_KEY='key')
+    retry = client.post('/api/v1/survey-responses/bulk/', data=items, format='json', HTTP_IDEMPOTENCY_KEY='key')
+    assert retry.json() == first.json()
+    assert SurveyResponse.objects.count() == 3
+
+
+def test_purge_idempotency_keys():
+    survey = create_survey(1)
+    submit(get_survey_response_data(survey), 'fresh')
+    submit(get_survey_response_data(survey), 'expired')
+    IdempotencyKey.objects.filter(key=stored_key('expired')).update(expires_at=timezone.now())
+
+    out = StringIO()
+    call_command('purge_idempotency_keys', stdout=out)
+    assert 'Deleted 1 expired idempotency keys' in out.getvalue()
+    assert list(IdempotencyKey.objects.values_list('key', flat=True)) == [stored_key('fresh')]
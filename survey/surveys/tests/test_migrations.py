@@ -0,0 +1,75 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+import pytest
+
+from survey.surveys.results import live_results
+from survey.surveys.schemas import load_survey_schemas
+
+
+def migrate(target):
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate([target])
+    return executor.loader.project_state([target]).apps
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unique_survey_response_migration_drops_repeated_ones():
+    apps = migrate(('surveys', '0006_indexes'))
+    try:
+        Survey = apps.get_model('surveys', 'Survey')
+        SurveyResponse = apps.get_model('surveys', 'SurveyResponse')
+        Response = apps.get_model('surveys', 'Response')
+        survey = Survey.objects.create(title='A Survey', start_date='2020-01-01T00:00Z', end_date='2020-02-01T00:00Z')
+        survey_responses = [SurveyResponse.objects.create(survey=survey, user_id='user') for _ in range(3)]
+        for survey_response in survey_responses:
+            survey_response.responses.add(Response.objects.create(response_text='text'))
+        SurveyResponse.objects.create(survey=survey, user_id='another user')
+
+        apps = migrate(('surveys', '0007_surveyresponse_user_survey_uniq'))
+        SurveyResponse = apps.get_model('surveys', 'SurveyResponse')
+        assert sorted(SurveyResponse.objects.values_list('user_id', flat=True)) == ['another user', 'user']
+        assert SurveyResponse.objects.get(user_id='user').pk == survey_responses[0].pk
+        assert apps.get_model('surveys', 'Response').objects.count() == 1
+    finally:
+        executor = MigrationExecutor(connection)
+        migrate(executor.loader.graph.leaf_nodes('surveys')[0])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_result_tallies_backfilled():
+    apps = migrate(('surveys', '0014_surveyresults'))
+    try:
+        Survey = apps.get_model('surveys', 'Survey')
+        Question = apps.get_model('surveys', 'Question')
+        ResponseOption = apps.get_model('surveys', 'ResponseOption')
+        Response = apps.get_model('surveys', 'Response')
+        SurveyResponse = apps.get_model('surveys', 'SurveyResponse')
+        SurveyTally = apps.get_model('surveys', 'SurveyTally')
+        survey = Survey.objects.create(title='A Survey', start_date='2020-01-01T00:00Z', end_date='2020-02-01T00:00Z')
+        text = Question.objects.create(survey=survey, title='Text', question_type='text')
+        select = Question.objects.create(survey=survey, title='Select', question_type='select multiple')
+        one, two = (ResponseOption.objects.create(question=select, title=title) for title in ('one', 'two'))
+        # nested responses
+        survey_response = SurveyResponse.objects.create(survey=survey, user_id='user')
+        response = Response.objects.create(question=select)
+        response.response_select.add(one, two)
+        survey_response.responses.add(response, Response.objects.create(question=text, response_text='text'))
+        # JSONB answers
+        SurveyResponse.objects.create(survey=survey, user_id='another user', answers={
+            str(text.pk): 'text', str(select.pk): [two.pk],
+        })
+        SurveyResponse.objects.create(survey=survey, user_id='third user', answers={str(text.pk): ''})
+        # counted by submissions since the tallies were added
+        SurveyTally.objects.create(survey=survey, count=1)
+
+        migrate(('surveys', '0015_backfill_result_tallies'))
+        schema = load_survey_schemas([survey.pk])[survey.pk]
+        results = live_results(schema)
+        assert results['respondents'] == 3
+        assert results['questions'][0]['answers'] == 2
+        assert [option['count'] for option in results['questions'][1]['options']] == [1, 2]
+    finally:
+        executor = MigrationExecutor(connection)
+        migrate(executor.loader.graph.leaf_nodes('surveys')[0])
@@ -0,0 +1,153 @@
+import json
+
+from django.db import connection
+from django.test import override_settings
+
+import pytest
+
+from survey.surveys import pagination
+from survey.surveys.models import SurveyResponse
+from survey.surveys.pagination import EstimatedCountPagination
+
+from .utils import create_survey, create_survey_responses
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _walk(client, url, django_assert_num_queries, queries_per_page):
+    """Follows next links till the end, checking each page's query budget."""
+    pks = []
+    while url:
+        with django_assert_num_queries(queries_per_page):
+            got = client.get(url)
+        pks += [item['pk'] for item in got['results']]
+        url = got['next']
+    return pks
+
+
+def test_survey_responses_keyset_pagination(api_admin, django_assert_num_queries):
+    survey = create_survey(2)
+    create_survey_responses(survey, 25)
+    # token, survey responses, responses with questions, selected options; no COUNT
+    pks = _walk(api_admin, '/api/v1/survey-responses/?pagination=cursor', django_assert_num_queries, 4)
+    assert len(pks) == 25
+    assert pks == sorted(pks)
+
+
+def test_keyset_pages_dont_shift_on_new_responses(api_admin):
+    survey = create_survey(1)
+    create_survey_responses(survey, 15)
+    got = api_admin.get('/api/v1/survey-responses/?pagination=cursor')
+    first_page = [item['pk'] for item in got['results']]
+    create_survey_responses(survey, 5)
+    got = api_admin.get(got['next'])
+    assert min(item['pk'] for item in got['results']) > max(first_page)
+    assert len(got['results']) == 10
+
+
+def test_questions_keyset_pagination(api_admin, django_assert_num_queries):
+    create_survey(25)
+    # token, validators, questions with surveys, response options
+    pks = _walk(api_admin, '/api/v1/questions/?pagination=cursor', django_assert_num_queries, 4)
+    assert len(pks) == 25
+    assert pks == sorted(pks)
+
+
+def test_page_number_pagination_by_default(api_admin):
+    create_survey(15)
+    got = api_admin.get('/api/v1/questions/')
+    assert got['count'] == 15
+    assert got['next'].endswith('?page=2')
+
+
+def _analyze(model):
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+
+@override_settings(PAGINATION_COUNT_ESTIMATE_THRESHOLD=100)
+def test_large_list_count_estimated(api_admin, django_assert_num_queries):
+    survey = create_survey(1)
+    create_survey_responses(survey, 150)
+    _analyze(SurveyResponse)
+    # token, count estimate, survey responses, responses with questions, selected options
+    with django_assert_num_queries(5):
+        got = api_admin.get('/api/v1/survey-responses/')
+    assert got['count_is_exact'] is False
+    assert 100 <= got['count'] <= 200
+
+
+@override_settings(PAGINATION_COUNT_ESTIMATE_THRESHOLD=100)
+def test_rows_past_low_count_estimate_reachable(api_admin, monkeypatch):
+    survey = create_survey(1)
+    create_survey_responses(survey, 150)
+    # stale statistics
+    monkeypatch.setattr(pagination, 'estimate_count', lambda queryset: 120)
+    got = api_admin.get('/api/v1/survey-responses/?page=12')
+    assert len(got['results']) == 10
+    assert got['next'].endswith('page=13')
+    got = api_admin.get('/api/v1/survey-responses/?page=15')
+    assert got['count_is_exact'] is False
+    assert got['count'] == 150
+    assert len(got['results']) == 10
+    assert got['next'] is None
+    api_admin.get('/api/v1/survey-responses/?page=16', expected_status_code=404)
+
+
+@override_settings(PAGINATION_COUNT_ESTIMATE_THRESHOLD=100)
+def test_pages_past_high_count_estimate_not_found(api_admin, monkeypatch):
+    survey = create_survey(1)
+    create_survey_responses(survey, 25)
+    monkeypatch.setattr(pagination, 'estimate_count', lambda queryset: 200)
+    got = api_admin.get('/api/v1/survey-responses/?page=3')
+    assert len(got['results']) == 5
+    assert got['next'] is None
+    api_admin.get('/api/v1/survey-responses/?page=4', expected_status_code=404)
+
+
+@override_settings(PAGINATION_COUNT_ESTIMATE_THRESHOLD=100)
+def test_small_list_count_exact(api_admin):
+    survey = create_survey(1)
+    create_survey_responses(survey, 50)
+    _analyze(SurveyResponse)
+    got = api_admin.get('/api/v1/survey-responses/')
+    assert got['count_is_exact'] is True
+    assert got['count'] == 50
+
+
+def _stream(client, url):
+    response = client.get(url, as_response=True)
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Type'] == 'application/json'
+    return json.loads(b''.join(response.streaming_content))
+
+
+def test_survey_responses_streamed_in_chunks(api_admin, settings, django_assert_num_queries):
+    settings.LIST_STREAM_CHUNK_SIZE = 2
+    survey = create_survey(2)
+    create_survey_responses(survey, 5)
+    paginated = _walk(api_admin, '/api/v1/survey-responses/?pagination=cursor', django_assert_num_queries, 4)
+    response = api_admin.get('/api/v1/survey-responses/?pagination=stream', as_response=True)
+    # pks through a server-side cursor, then survey responses, responses with
+    # questions and selected options for each of 3 chunks
+    with django_assert_num_queries(1 + 3 * 3):
+        streamed = json.loads(b''.join(response.streaming_content))
+    assert [item['pk'] for item in streamed] == paginated
+    assert streamed[0] == api_admin.get(f'/api/v1/survey-responses/{paginated[0]}/')
+
+
+def test_questions_streamed_in_requested_order(api_admin, settings):
+    settings.LIST_STREAM_CHUNK_SIZE = 2
+    surveys = [create_survey(3), create_survey(2)]
+    streamed = _stream(api_admin, '/api/v1/questions/?pagination=stream&ordering=-survey')
+    assert [item['survey'] for item in streamed] == [surveys[1].pk] * 2 + [surveys[0].pk] * 3
+    assert streamed[0] == api_admin.get(f'/api/v1/questions/{streamed[0]["pk"]}/')
+
+
+def test_streamed_when_pagination_is_off(api_admin, monkeypatch):
+    monkeypatch.setattr(EstimatedCountPagination, 'page_size', None)
+    assert _stream(api_admin, '/api/v1/survey-responses/') == []
+    create_survey(3)
+    assert len(_stream(api_admin, '/api/v1/questions/')) == 3
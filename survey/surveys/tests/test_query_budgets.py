@@ -0,0 +1,132 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from drf_writable_nested.serializers import WritableNestedModelSerializer
+
+import pytest
+
+from survey.surveys.models import SurveyResponse
+from survey.surveys.serializers import SurveyResponseSerializer
+
+from .utils import create_survey, create_survey_responses, get_survey_response_data
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+SIZES = [1, 5, 20]
+
+
+@pytest.mark.parametrize('num_questions', SIZES)
+def test_surveys_list_query_budget(api_user, django_assert_num_queries, num_questions):
+    for i in range(3):
+        create_survey(num_questions, title=f'Survey {i}')
+    # validators, count, surveys, questions, response options
+    with django_assert_num_queries(5):
+        got = api_user.get('/api/v1/surveys/')
+    assert len(got['results'][0]['questions']) == num_questions
+
+
+@pytest.mark.parametrize('num_questions', SIZES)
+def test_survey_detail_query_budget(api_user, django_assert_num_queries, num_questions):
+    survey = create_survey(num_questions)
+    # validators, survey, questions, response options
+    with django_assert_num_queries(4):
+        got = api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    assert len(got['questions']) == num_questions
+
+
+@pytest.mark.parametrize('num_questions', SIZES)
+def test_questions_list_query_budget(api_admin, django_assert_num_queries, num_questions):
+    create_survey(num_questions)
+    # token, validators, count estimate, count, questions with surveys, response options
+    with django_assert_num_queries(6):
+        got = api_admin.get('/api/v1/questions/')
+    assert got['results'][0]['survey_title'] == 'A Survey'
+
+
+@pytest.mark.parametrize('num_questions', SIZES)
+def test_survey_responses_list_query_budget(api_admin, django_assert_num_queries, num_questions):
+    survey = create_survey(num_questions)
+    create_survey_responses(survey, 3)
+    # token, count estimate, count, survey responses, responses with questions, selected options
+    with django_assert_num_queries(6):
+        got = api_admin.get('/api/v1/survey-responses/')
+    assert len(got['results'][0]['responses']) == num_questions
+
+
+@pytest.mark.parametrize('num_questions', [10, 30])
+def test_survey_responses_prefetch_benchmark(num_questions):
+    """Before/after query counts for a full page of large survey responses."""
+    survey = create_survey(num_questions)
+    create_survey_responses(survey, 10)
+
+    with CaptureQueriesContext(connection) as before:
+        SurveyResponseSerializer(SurveyResponse.objects.all(), many=True).data
+    with CaptureQueriesContext(connection) as after:
+        SurveyResponseSerializer(SurveyResponse.objects.with_responses(), many=True).data
+
+    # one query per response for question, selected ids and selected titles
+    assert len(before) > 10 * num_questions * 3
+    assert len(after) == 3
+
+
+@pytest.mark.parametrize('num_questions', [10, 50])
+def test_survey_response_validation_query_budget(django_assert_num_queries, num_questions):
+    survey = create_survey(num_questions)
+    data = get_survey_response_data(survey)
+    # survey, compiled survey schema
+    with django_assert_num_queries(2):
+        assert SurveyResponseSerializer(data=data).is_valid()
+    # survey, the schema is cached until the survey changes
+    with django_assert_num_queries(1):
+        assert SurveyResponseSerializer(data=data).is_valid()
+
+
+class NestedSurveyResponseSerializer(SurveyResponseSerializer):
+    """The former write path, saving nested responses one by one."""
+
+    def create(self, validated_data):
+        return WritableNestedModelSerializer.create(self, validated_data)
+
+
+@pytest.mark.parametrize('num_questions', [10, 40])
+def test_survey_response_write_benchmark(num_questions):
+    """Before/after INSERT counts for saving a single survey response."""
+    survey = create_survey(num_questions)
+    nested = NestedSurveyResponseSerializer(data=get_survey_response_data(survey))
+    nested.is_valid(raise_exception=True)
+    bulk = SurveyResponseSerializer(data=get_survey_response_data(survey))
+    bulk.is_valid(raise_exception=True)
+
+    with CaptureQueriesContext(connection) as before:
+        nested.save()
+    with CaptureQueriesContext(connection) as after:
+        bulk.save()
+
+    def inserts(queries):
+        return sum(query['sql'].lstrip().upper().startswith('INSERT') for query in queries)
+
+    # a response and its selected options per question, besides lookups
+    assert inserts(before) > 2 * num_questions
+    assert len(before) > 4 * num_questions
+    # survey response, responses, selected options, links to responses,
+    # then the survey and option tally upserts
+    assert inserts(after) == 6
+    assert SurveyResponse.objects.get(pk=bulk.instance.pk).responses.count() == num_questions
+
+
+@pytest.mark.parametrize('num_questions', SIZES)
+def test_survey_create_and_update_responses_prefetched(api_admin, surv_active, num_questions):
+    surv_active['questions'] = [
+        {'title': f'Question {i}', 'question_type': 'select', 'response_options': [{'title': 'one'}, {'title': 'two'}]}
+        for i in range(num_questions)
+    ]
+    with CaptureQueriesContext(connection) as created:
+        got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    with CaptureQueriesContext(connection) as updated:
+        api_admin.patch(f'/api/v1/surveys/{got["pk"]}/', data={'title': 'Changed'})
+    # response options are read in bulk rather than per question
+    for queries in (created, updated):
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        assert sum('FROM "surveys_responseoption"' in sql for sql in selects) <= 2
@@ -0,0 +1,96 @@
+import uuid
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+import pytest
+
+from survey.surveys.filters import ResponseFilter
+from survey.surveys.models import Question, Response, Survey, SurveyResponse
+from survey.surveys.views import ResponseViewSet
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def seeded():
+    """A few thousand mostly finished surveys, their questions and responses."""
+    now = datetime.now(tz=timezone.utc)
+    surveys = Survey.objects.bulk_create(
+        Survey(
+            title=f'Survey {i}',
+            start_date=now - timedelta(days=i + 1),
+            end_date=now + timedelta(days=1) if i % 100 == 0 else now - timedelta(days=i),
+        )
+        for i in range(3000)
+    )
+    Question.objects.bulk_create(
+        Question(survey=survey, title=f'Question {i}')
+        for survey in surveys
+        for i in range(3)
+    )
+    survey_responses = SurveyResponse.objects.bulk_create(
+        SurveyResponse(survey=surveys[i % 100], user_id=str(uuid.uuid4()))
+        for i in range(5000)
+    )
+    Survey.objects.update_search_vector()
+    with connection.cursor() as cursor:
+        for model in (Survey, Question, SurveyResponse):
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+        # what autovacuum does to fresh GIN entries
+        cursor.execute("SELECT gin_clean_pending_list('survey_search_vector_idx')")
+    return survey_responses[0]
+
+
+def _assert_no_seq_scan(queryset, model):
+    plan = queryset.explain()
+    assert f'Seq Scan on {model._meta.db_table}' not in plan, plan
+
+
+def test_active_surveys_use_index(seeded):
+    _assert_no_seq_scan(Survey.objects.get_active_surveys(), Survey)
+
+
+def test_survey_search_uses_index(seeded):
+    _assert_no_seq_scan(Survey.objects.search('42'), Survey)
+
+
+def test_surveys_page_uses_index(seeded):
+    _assert_no_seq_scan(Survey.objects.all()[:10], Survey)
+
+
+def test_user_survey_responses_use_index(seeded):
+    _assert_no_seq_scan(SurveyResponse.objects.by_user(seeded.user_id), SurveyResponse)
+
+
+def test_already_taken_survey_check_uses_index(seeded):
+    queryset = SurveyResponse.objects.filter(survey=seeded.survey_id, user_id=seeded.user_id)
+    _assert_no_seq_scan(queryset, SurveyResponse)
+
+
+def test_questions_ordered_by_survey_use_index(seeded):
+    _assert_no_seq_scan(Question.objects.order_by('survey_id', 'pk')[:10], Question)
+
+
+def test_survey_questions_use_index(seeded):
+    _assert_no_seq_scan(Question.objects.filter(survey=seeded.survey_id), Question)
+
+
+def test_response_text_search_uses_index(seeded):
+    question = Question.objects.first()
+    Response.objects.bulk_create(
+        (Response(question=question, response_text=f'Answer number {i}') for i in range(20000)),
+        batch_size=5000,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {Response._meta.db_table}')
+        cursor.execute("SELECT gin_clean_pending_list('response_text_trgm_idx')")
+    # queries of the endpoint: the first keyset page and a following one,
+    # where walking the pkey index until enough rows match is tempting
+    queryset = ResponseFilter({'search': 'refund'}, queryset=ResponseViewSet.queryset).qs
+    cursor_pk = Response.objects.order_by('pk').values_list('pk', flat=True)[10]
+    for page in (queryset, queryset.filter(pk__gt=cursor_pk)):
+        plan = page.order_by('pk')[:11].explain()
+        assert 'response_text_trgm_idx' in plan, plan
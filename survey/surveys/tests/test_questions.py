@@ -68,3 +68,15 @@ def test_can_delete_question_from_survey(api_admin, surv_active, question_type):
     api_admin.delete(f'/api/v1/questions/{question.pk}/')
     got_detail = api_admin.get(f'/api/v1/surveys/{got["pk"]}/')
     assert len(got_detail['questions']) == 2  # initially was 3
+
+
+@pytest.mark.parametrize('ordering', ['survey', '-survey'])
+def test_questions_ordered_by_survey(api_admin, surv_active, surv_active2, ordering):
+    api_admin.post('/api/v1/surveys/', data=surv_active)
+    api_admin.post('/api/v1/surveys/', data=surv_active2)
+    got = api_admin.get(f'/api/v1/questions/?ordering={ordering}')
+    surveys = [question['survey'] for question in got['results']]
+    assert surveys == sorted(surveys, reverse=ordering.startswith('-'))
+    # questions of the same survey are ordered by pk, in the same direction
+    pks = [(question['survey'], question['pk']) for question in got['results']]
+    assert pks == sorted(pks, reverse=ordering.startswith('-'))
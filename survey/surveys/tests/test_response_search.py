@@ -0,0 +1,67 @@
+import pytest
+
+from survey.surveys.models import Question, Response, SurveyResponse
+
+from .utils import create_survey
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def answers():
+    """Text answers to two surveys, one of them mentioning a refund twice."""
+    questions = []
+    for title in ('Survey 1', 'Survey 2'):
+        survey = create_survey(0, title=title)
+        questions.append(Question.objects.create(survey=survey, title='Any issues?'))
+    Response.objects.bulk_create([
+        Response(question=questions[0], response_text='I want a REFUND'),
+        Response(question=questions[0], response_text='App crashes on start'),
+        Response(question=questions[1], response_text='Refunded already'),
+        Response(question=questions[1], response_text='All good'),
+    ])
+    return questions
+
+
+def test_search_text_answers(api_admin, answers):
+    got = api_admin.get('/api/v1/responses/?search=refund')
+    assert [r['response_text'] for r in got['results']] == ['I want a REFUND', 'Refunded already']
+    assert got['results'][0]['question_title'] == 'Any issues?'
+
+
+def test_search_scoped_to_survey(api_admin, answers):
+    survey_pk = answers[1].survey_id
+    got = api_admin.get(f'/api/v1/responses/?search=refund&survey={survey_pk}')
+    assert [r['response_text'] for r in got['results']] == ['Refunded already']
+
+
+def test_search_scoped_to_question(api_admin, answers):
+    got = api_admin.get(f'/api/v1/responses/?search=crash&question={answers[0].pk}')
+    assert [r['response_text'] for r in got['results']] == ['App crashes on start']
+
+
+def test_search_phrase_too_short(api_admin, answers):
+    api_admin.get('/api/v1/responses/?search=re', expected_status_code=400)
+
+
+def test_search_paginated_by_cursor(api_admin, answers):
+    Response.objects.bulk_create(
+        Response(question=answers[0], response_text=f'refund #{i}') for i in range(15)
+    )
+    got = api_admin.get('/api/v1/responses/?search=refund')
+    assert len(got['results']) == 10
+    got = api_admin.get(got['next'])
+    assert len(got['results']) == 7
+    assert got['next'] is None
+
+
+def test_search_refused_in_jsonb_storage_mode(api_admin, answers, settings):
+    settings.SURVEY_RESPONSES_STORAGE = SurveyResponse.JSONB
+    got = api_admin.get('/api/v1/responses/?search=refund', expected_status_code=400)
+    assert 'search' in got
+    api_admin.get('/api/v1/responses/')
+
+
+def test_user_cant_search_answers(api_user, answers):
+    api_user.get('/api/v1/responses/?search=refund', expected_status_code=401)
@@ -0,0 +1,133 @@
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.utils import timezone
+
+import pytest
+
+from survey.surveys.ingestion import get_queue_stats
+from survey.surveys.models import QueuedSubmission, SurveyResponse
+
+from .utils import CustomSurveyResponse, create_survey, get_survey_response_data
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def async_mode(settings):
+    settings.SURVEY_RESPONSES_ASYNC = True
+
+
+def process_submissions():
+    out = StringIO()
+    call_command('process_submissions', '--once', stdout=out)
+    return out.getvalue()
+
+
+def test_submission_is_queued(api_user, async_mode, django_assert_num_queries):
+    survey = create_survey(5)
+    data = get_survey_response_data(survey)
+    # compiled survey schema, queued submission
+    with django_assert_num_queries(2):
+        response = api_user.post('/api/v1/survey-responses/', data=data, expected_status_code=202, as_response=True)
+
+    got = response.json()
+    assert got['status'] == 'pending'
+    assert response['Location'].endswith(f'/api/v1/submissions/{got["receipt"]}/')
+    assert len(response.cookies['user_id'].value) == 36
+    assert not SurveyResponse.objects.exists()
+
+
+def test_invalid_submission_is_rejected_right_away(api_admin, api_user, surv_active, async_mode):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    survey_response = CustomSurveyResponse(admin_got['pk']).get_invalid_sr_responses_lt_questions()
+    got = api_user.post('/api/v1/survey-responses/', data=survey_response, expected_status_code=400)
+    assert got == {'non_field_errors': ['You have not answered all the survey questions']}
+    assert not QueuedSubmission.objects.exists()
+
+
+def test_worker_saves_queued_submissions(api_user, async_mode):
+    survey = create_survey(3)
+    receipt = api_user.post(
+        '/api/v1/survey-responses/',
+        data=get_survey_response_data(survey),
+        expected_status_code=202,
+    )['receipt']
+    again = api_user.post(
+        '/api/v1/survey-responses/',
+        data=get_survey_response_data(survey),
+        expected_status_code=202,
+    )['receipt']
+
+    assert 'Processed 2 submissions' in process_submissions()
+
+    created = api_user.get(f'/api/v1/submissions/{receipt}/')
+    assert created['status'] == 'created'
+    assert SurveyResponse.objects.get(pk=created['result']['pk']).responses.count() == 3
+    rejected = api_user.get(f'/api/v1/submissions/{again}/')
+    assert rejected['status'] == 'rejected'
+    assert rejected['result'] == {
+        'errors': {'non_field_errors': ['You\'ve already taken survey "A Survey" before']},
+    }
+
+
+def test_submission_refused_by_database_fails_alone(api_user, async_mode, monkeypatch):
+    survey = create_survey(2)
+    receipts = []
+    for _ in range(3):
+        api_user.cookies.clear()
+        data = get_survey_response_data(survey)
+        receipts.append(api_user.post('/api/v1/survey-responses/', data=data, expected_status_code=202)['receipt'])
+    user_ids = [QueuedSubmission.objects.get(receipt=receipt).payload['user_id'] for receipt in receipts]
+    manager = type(SurveyResponse.objects)
+    bulk_create_submissions = manager.bulk_create_submissions
+
+    def refuse_poison(self, submissions):
+        if any(submission['user_id'] == user_ids[1] for submission in submissions):
+            raise IntegrityError('refused')
+        return bulk_create_submissions(self, submissions)
+
+    monkeypatch.setattr(manager, 'bulk_create_submissions', refuse_poison)
+    assert 'Processed 3 submissions' in process_submissions()
+
+    statuses = [api_user.get(f'/api/v1/submissions/{receipt}/')['status'] for receipt in receipts]
+    assert statuses == ['created', 'failed', 'created']
+    assert set(SurveyResponse.objects.values_list('user_id', flat=True)) == {user_ids[0], user_ids[2]}
+
+
+def test_unknown_receipt(api_user):
+    api_user.get(f'/api/v1/submissions/{uuid.uuid4()}/', expected_status_code=404)
+    api_user.get('/api/v1/submissions/not-a-receipt/', expected_status_code=404)
+
+
+def test_queue_stats(api_user, async_mode):
+    survey = create_survey(1)
+    for _ in range(3):
+        api_user.cookies.clear()
+        api_user.post('/api/v1/survey-responses/', data=get_survey_response_data(survey), expected_status_code=202)
+    QueuedSubmission.objects.update(created_at=timezone.now() - timedelta(seconds=30))
+
+    stats = get_queue_stats()
+    assert stats['depth'] == 3
+    assert stats['lag'] >= 30
+    assert stats['throughput'] == 0
+
+    process_submissions()
+    out = StringIO()
+    call_command('submission_queue_stats', stdout=out)
+    assert out.getvalue() == 'depth: 0\nlag: 0\nthroughput: 0.05\n'
+
+
+def test_worker_purges_expired_outcomes(settings):
+    survey = create_survey(1)
+    QueuedSubmission.objects.create(
+        payload=get_survey_response_data(survey),
+        status=QueuedSubmission.CREATED,
+        processed_at=timezone.now() - timedelta(seconds=settings.SUBMISSION_RESULT_TIMEOUT + 1),
+    )
+    assert 'Purged 1 processed submissions' in process_submissions()
+    assert not QueuedSubmission.objects.exists()
@@ -0,0 +1,206 @@
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+import pytest
+
+from survey.surveys import cache as cache_module
+from survey.surveys.cache import (
+    COALESCED,
+    HITS,
+    LOCK_KEY,
+    MISSES,
+    REPRESENTATION_KEY,
+    bump_survey_version,
+    get_cache_stats,
+    get_cache_timeout,
+    get_survey_schemas,
+    get_survey_versions,
+)
+from survey.surveys.models import Question, ResponseOption, Survey
+
+from .utils import create_survey
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_survey_detail_served_from_cache(api_user, django_assert_num_queries):
+    survey = create_survey(5)
+    got = api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    # validators and the survey row itself
+    with django_assert_num_queries(2):
+        assert api_user.get(f'/api/v1/surveys/{survey.pk}/') == got
+
+
+def test_surveys_list_served_from_cache(api_user, django_assert_num_queries):
+    for i in range(3):
+        create_survey(5, title=f'Survey {i}')
+    got = api_user.get('/api/v1/surveys/')
+    # validators, count and surveys page
+    with django_assert_num_queries(3):
+        assert api_user.get('/api/v1/surveys/') == got
+
+
+def test_only_changed_survey_is_serialized_again(api_user, django_assert_num_queries):
+    create_survey(5, title='Survey 1')
+    survey = create_survey(5, title='Survey 2')
+    api_user.get('/api/v1/surveys/')
+    survey.title = 'Survey 2 changed'
+    survey.save()
+    # validators, count, surveys page, questions and options of the changed survey
+    with django_assert_num_queries(5):
+        got = api_user.get('/api/v1/surveys/')
+    assert got['results'][1]['title'] == 'Survey 2 changed'
+
+
+def test_question_update_invalidates_survey(api_admin, api_user, surv_active):
+    survey = api_admin.post('/api/v1/surveys/', data=surv_active)
+    api_user.get(f'/api/v1/surveys/{survey["pk"]}/')
+    question_pk = survey['questions'][0]['pk']
+    api_admin.patch(f'/api/v1/questions/{question_pk}/', data={'title': 'Changed'})
+    got = api_user.get(f'/api/v1/surveys/{survey["pk"]}/')
+    titles = {question['pk']: question['title'] for question in got['questions']}
+    assert titles[question_pk] == 'Changed'
+
+
+def test_moved_question_invalidates_both_surveys(api_user):
+    survey1 = create_survey(2, title='Survey 1')
+    survey2 = create_survey(2, title='Survey 2')
+    api_user.get('/api/v1/surveys/')
+    question = survey1.questions.first()
+    question.survey = survey2
+    question.save()
+    got = api_user.get('/api/v1/surveys/')
+    assert len(got['results'][0]['questions']) == 1
+    assert len(got['results'][1]['questions']) == 3
+
+
+def test_response_option_change_invalidates_survey(api_user):
+    survey = create_survey(1)
+    api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    option = ResponseOption.objects.filter(question__survey=survey).first()
+    option.title = 'Changed'
+    option.save()
+    got = api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    titles = {option['id']: option['title'] for option in got['questions'][0]['response_options']}
+    assert titles[option.pk] == 'Changed'
+
+
+def test_question_delete_invalidates_survey(api_user):
+    survey = create_survey(2)
+    api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    Question.objects.filter(survey=survey).first().delete()
+    got = api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    assert len(got['questions']) == 1
+
+
+@override_settings(SURVEY_CACHE_TIMEOUT=600)
+def test_cache_timeout_respects_end_date():
+    survey = create_survey(1)
+    assert get_cache_timeout(survey) == 600
+    survey.end_date = datetime.now(tz=timezone.utc) + timedelta(seconds=30)
+    assert 0 < get_cache_timeout(survey) <= 30
+    survey.end_date = datetime.now(tz=timezone.utc) - timedelta(seconds=30)
+    assert get_cache_timeout(survey) < 0
+
+
+def test_cache_counts_hits_and_misses(api_user):
+    survey = create_survey(1)
+    api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    assert get_cache_stats() == {HITS: 2, MISSES: 1, COALESCED: 0}
+
+
+def _lease_survey(survey):
+    """Pretends another worker is rebuilding the survey."""
+    version = get_survey_versions([survey.pk])[survey.pk]
+    cache.add(LOCK_KEY.format(pk=survey.pk, version=version), True)
+
+
+def test_leased_survey_served_stale(api_user, django_assert_num_queries):
+    survey = create_survey(2)
+    api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    Survey.objects.filter(pk=survey.pk).update(title='Changed')
+    bump_survey_version(survey.pk)
+    _lease_survey(survey)
+    with django_assert_num_queries(2):
+        got = api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    assert got['title'] == 'A Survey'
+    assert get_cache_stats()[COALESCED] == 1
+
+
+def test_leased_survey_served_stale_without_validators(api_user):
+    survey = create_survey(2)
+    api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    survey.title = 'Changed'
+    survey.save()
+    _lease_survey(survey)
+    got = api_user.get(f'/api/v1/surveys/{survey.pk}/', as_response=True)
+    assert got.data['title'] == 'A Survey'
+    # the previous version must not be stored under validators of the new one
+    assert 'ETag' not in got
+    assert 'Last-Modified' not in got
+    assert got['Cache-Control'] == 'no-cache'
+    cache.clear()
+    got = api_user.get(f'/api/v1/surveys/{survey.pk}/', as_response=True)
+    assert got.data['title'] == 'Changed'
+    assert got['ETag']
+
+
+def test_leased_survey_awaited(api_user, monkeypatch, django_assert_num_queries):
+    survey = create_survey(2)
+    _lease_survey(survey)
+
+    def rebuilt_by_other_worker(seconds):
+        version = get_survey_versions([survey.pk])[survey.pk]
+        cache.set(REPRESENTATION_KEY.format(pk=survey.pk, version=version), {'pk': survey.pk})
+
+    monkeypatch.setattr(cache_module.time, 'sleep', rebuilt_by_other_worker)
+    with django_assert_num_queries(2):
+        got = api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    assert got == {'pk': survey.pk}
+    assert get_cache_stats()[COALESCED] == 1
+
+
+@override_settings(SURVEY_CACHE_LOCK_WAIT=0)
+def test_leased_survey_rebuilt_when_lease_outlives_wait(api_user):
+    survey = create_survey(2)
+    _lease_survey(survey)
+    got = api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    assert len(got['questions']) == 2
+    assert get_cache_stats()[COALESCED] == 0
+
+
+def test_warm_survey_cache(api_user, survey_overdue, api_admin, django_assert_num_queries):
+    survey = create_survey(5)
+    overdue = api_admin.post('/api/v1/surveys/', data=survey_overdue)
+    call_command('warm_survey_cache', stdout=StringIO())
+    with django_assert_num_queries(2):
+        api_user.get(f'/api/v1/surveys/{survey.pk}/')
+    assert get_cache_stats() == {HITS: 1, MISSES: 1, COALESCED: 0}
+    # overdue surveys are left alone
+    with django_assert_num_queries(5):
+        api_admin.get(f'/api/v1/surveys/{overdue["pk"]}/')
+
+
+def test_survey_schema_cached_until_survey_changes(django_assert_num_queries):
+    survey = create_survey(2)
+    assert len(get_survey_schemas([survey.pk])[survey.pk].questions) == 2
+    with django_assert_num_queries(0):
+        assert len(get_survey_schemas([survey.pk])[survey.pk].questions) == 2
+
+    question = Question.objects.create(survey=survey, title='Another', question_type=Question.SELECT)
+    assert len(get_survey_schemas([survey.pk])[survey.pk].questions) == 3
+    option = ResponseOption.objects.create(question=question, title='Option')
+    assert get_survey_schemas([survey.pk])[survey.pk].questions[question.pk].options == {option.pk: 'Option'}
+
+
+def test_survey_schema_skips_missing_surveys():
+    survey = create_survey(1)
+    assert set(get_survey_schemas([survey.pk, survey.pk + 1])) == {survey.pk}
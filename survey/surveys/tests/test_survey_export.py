@@ -0,0 +1,71 @@
+import csv
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+
+from survey.surveys.models import SurveyResponse
+
+from .utils import CustomSurveyResponse, create_survey, create_survey_responses
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+def export(client, survey_pk, export_format):
+    response = client.get(f'/api/v1/surveys/{survey_pk}/export/?format={export_format}', as_response=True)
+    assert response.status_code == 200
+    assert response.streaming
+    return response, b''.join(response.streaming_content).decode()
+
+
+def test_export_csv_from_both_storages(api_admin, api_user, surv_active, settings):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    in_tables = api_user.post('/api/v1/survey-responses/', data=custom_sr.get_valid_sr())
+    settings.SURVEY_RESPONSES_STORAGE = SurveyResponse.JSONB
+    api_user.cookies.clear()
+    in_jsonb = api_user.post('/api/v1/survey-responses/', data=custom_sr.get_valid_sr())
+
+    response, content = export(api_admin, admin_got['pk'], 'csv')
+    assert response['Content-Type'] == 'text/csv'
+    assert response['Content-Disposition'] == f'attachment; filename="survey-{admin_got["pk"]}.csv"'
+    header, *rows = csv.reader(content.splitlines())
+    assert header == ['pk', 'user_id', 'Question Text', 'Question Select', 'Question Select Multiple']
+    assert rows == [
+        [str(survey_response['pk']), survey_response['user_id'], 'textt', 'two', 'one; three']
+        for survey_response in (in_tables, in_jsonb)
+    ]
+
+
+def test_export_ndjson_matches_api(api_admin, api_user, surv_active):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    saved = api_user.post('/api/v1/survey-responses/', data=CustomSurveyResponse(admin_got['pk']).get_valid_sr())
+
+    response, content = export(api_admin, admin_got['pk'], 'ndjson')
+    assert response['Content-Type'] == 'application/x-ndjson'
+    exported, = [json.loads(line) for line in content.splitlines()]
+    by_question = lambda survey_response: sorted(survey_response['responses'], key=lambda r: r['question'])  # noqa
+    assert by_question(exported) == by_question(saved)
+    assert exported['pk'] == saved['pk']
+
+
+def test_export_fetches_in_chunks(api_admin, settings):
+    settings.SURVEY_EXPORT_CHUNK_SIZE = 2
+    survey = create_survey(2)
+    create_survey_responses(survey, 5)
+    response = api_admin.get(f'/api/v1/surveys/{survey.pk}/export/?format=csv', as_response=True)
+    with CaptureQueriesContext(connection) as queries:
+        header, *rows = csv.reader(line.decode() for line in response.streaming_content)
+    # a single query, its rows fetched from the server-side cursor two at a time
+    assert len(queries) == 1
+    assert [row[2:] for row in rows] == [['Option 0', 'Option 0']] * 5
+
+
+def test_export_is_admin_only(api_admin, api_user):
+    survey = create_survey(1)
+    api_user.get(f'/api/v1/surveys/{survey.pk}/export/?format=csv', expected_status_code=401)
+    api_admin.get('/api/v1/surveys/0/export/?format=csv', expected_status_code=404)
+    api_admin.get(f'/api/v1/surveys/{survey.pk}/export/?format=xml', expected_status_code=404)
@@ -55,11 +55,15 @@ def test_cant_resp_with_unrelated_resp_options(api_admin, api_user, surv_active,
     admin_got2 = api_admin.post('/api/v1/surveys/', data=surv_active2)
     custom_sr = CustomSurveyResponse(admin_got1['pk'])
     surv_resp = custom_sr.get_invalid_sr_unrelated_resp_options(admin_got2['pk'])
-    api_user.post(
+    got = api_user.post(
         '/api/v1/survey-responses/',
         data=surv_resp,
         expected_status_code=400,
     )
+    option_pk = custom_sr.Rid2.sel_pks[1]
+    assert got['non_field_errors'][0].startswith(
+        f'Response option {option_pk} "two" is unrelated to the question {custom_sr.Qid.sel_pk}'
+    )
 
 
 def test_cant_answer_unrelated_question(api_admin, api_user, surv_active, surv_active2):
@@ -67,11 +71,14 @@ def test_cant_answer_unrelated_question(api_admin, api_user, surv_active, surv_a
     admin_got2 = api_admin.post('/api/v1/surveys/', data=surv_active2)
     custom_sr = CustomSurveyResponse(admin_got1['pk'])
     surv_resp = custom_sr.get_invalid_sr_unrelated_questions(admin_got2['pk'])
-    api_user.post(
+    got = api_user.post(
         '/api/v1/survey-responses/',
         data=surv_resp,
         expected_status_code=400,
     )
+    assert got == {
+        'non_field_errors': [f'These questions are not related to the survey: {{{custom_sr.Qid2.sel_pk}}}'],
+    }
 
 
 def test_resp_opts_popped_if_qtype_is_text(api_admin, api_user, surv_active):
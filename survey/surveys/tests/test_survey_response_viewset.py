@@ -1,7 +1,14 @@
+import uuid
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 import pytest
 
 from rest_framework.test import APIClient
 
+from survey.surveys.models import Response, SurveyResponse
+
 from .utils import CustomSurveyResponse
 
 
@@ -50,3 +57,23 @@ def test_no_deleted_question_in_surv_resp(api_admin, api_user, surv_active):
         response['question_title'] for response in user_got['responses']
     ]
     assert 'deleted' in responses
+
+
+def test_user_cant_take_survey_twice(api_admin, api_user, surv_active):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    survey_response = CustomSurveyResponse(admin_got['pk']).get_valid_sr()
+    user_got = api_user.post('/api/v1/survey-responses/', data=survey_response)
+    api_user.cookies['user_id'] = user_got['user_id']
+    got = api_user.post('/api/v1/survey-responses/', data=survey_response, expected_status_code=400)
+    assert got == {'non_field_errors': ['You\'ve already taken survey "A Survey" before']}
+    assert SurveyResponse.objects.count() == 1
+    assert Response.objects.count() == 3
+
+
+def test_already_taken_check_costs_no_query(api_admin, api_user, surv_active):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    survey_response = CustomSurveyResponse(admin_got['pk']).get_valid_sr()
+    api_user.cookies['user_id'] = str(uuid.uuid4())
+    with CaptureQueriesContext(connection) as submission:
+        api_user.post('/api/v1/survey-responses/', data=survey_response)
+    assert not any('SELECT (1) AS "a"' in query['sql'] for query in submission)
@@ -0,0 +1,140 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+import pytest
+
+from survey.surveys.cache import get_survey_schemas
+from survey.surveys.models import OptionTally, SurveyResponse, SurveyResults, SurveyTally
+from survey.surveys.results import compute_results, live_results
+
+from .utils import CustomSurveyResponse, create_survey, create_survey_responses, get_survey_response_data
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+def by_title(results):
+    return {question['title']: question for question in results['questions']}
+
+
+def test_results_count_both_storages(api_admin, api_user, surv_active, settings):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    api_user.post('/api/v1/survey-responses/', data=custom_sr.get_valid_sr())
+    settings.SURVEY_RESPONSES_STORAGE = SurveyResponse.JSONB
+    api_user.cookies.clear()
+    api_user.post('/api/v1/survey-responses/', data=custom_sr.get_another_valid_sr())
+
+    got = api_admin.get(f'/api/v1/surveys/{admin_got["pk"]}/results/')
+    assert got == compute_results(get_survey_schemas([admin_got['pk']])[admin_got['pk']])
+    assert got['respondents'] == 2
+    questions = by_title(got)
+    assert questions['Question Text']['answers'] == 2
+    assert 'options' not in questions['Question Text']
+    assert [(option['count'], option['percentage']) for option in questions['Question Select']['options']] == [
+        (1, 50.0), (1, 50.0),
+    ]
+    assert [option['count'] for option in questions['Question Select Multiple']['options']] == [1, 1, 2]
+    assert questions['Question Select Multiple']['options'][2]['percentage'] == 100.0
+
+
+def test_empty_jsonb_text_answers_are_not_counted(api_admin, surv_active):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    SurveyResponse.objects.create(survey_id=admin_got['pk'], user_id='user', answers={
+        str(custom_sr.Qid.txt_pk): '',
+        str(custom_sr.Qid.sel_pk): [custom_sr.Rid.sel_pks[0]],
+    })
+    schema = get_survey_schemas([admin_got['pk']])[admin_got['pk']]
+    questions = by_title(compute_results(schema))
+    assert questions['Question Text']['answers'] == 0
+    assert [option['count'] for option in questions['Question Select']['options']] == [1, 0]
+    call_command('rebuild_result_tallies', stdout=StringIO())
+    assert live_results(schema) == compute_results(schema)
+
+
+def test_results_query_count_is_constant(api_admin, django_assert_num_queries):
+    survey = create_survey(5)
+    create_survey_responses(survey, 20)
+    call_command('rebuild_result_tallies', stdout=StringIO())
+    api_admin.get(f'/api/v1/surveys/{survey.pk}/results/')
+    # token, survey tally, option tallies; there are no text questions
+    with django_assert_num_queries(3):
+        got = api_admin.get(f'/api/v1/surveys/{survey.pk}/results/')
+    assert got['respondents'] == 20
+    assert [option['count'] for option in got['questions'][0]['options']] == [20, 0, 0]
+    assert got['questions'][0]['options'][0]['percentage'] == 100.0
+
+
+def test_results_without_respondents(api_admin):
+    survey = create_survey(1, num_options=2)
+    got = api_admin.get(f'/api/v1/surveys/{survey.pk}/results/')
+    assert got['respondents'] == 0
+    assert [option['percentage'] for option in got['questions'][0]['options']] == [0.0, 0.0]
+
+
+def test_results_are_admin_only(api_admin, api_user):
+    survey = create_survey(1)
+    api_user.get(f'/api/v1/surveys/{survey.pk}/results/', expected_status_code=401)
+    api_admin.get('/api/v1/surveys/0/results/', expected_status_code=404)
+
+
+def test_bulk_submissions_are_tallied(api_admin):
+    survey = create_survey(2)
+    items = [get_survey_response_data(survey) for _ in range(3)]
+    items.append(items[0])  # rejected
+    api_admin.post('/api/v1/survey-responses/bulk/', data=items, expected_status_code=200)
+    schema = get_survey_schemas([survey.pk])[survey.pk]
+    assert live_results(schema) == compute_results(schema)
+    assert SurveyTally.objects.get(pk=survey.pk).count == 3
+
+
+def test_rebuild_result_tallies():
+    survey = create_survey(2)
+    create_survey_responses(survey, 4)
+    with pytest.raises(CommandError, match=f'Wrong result tallies of surveys {survey.pk}'):
+        call_command('rebuild_result_tallies', '--verify', stdout=StringIO())
+
+    out = StringIO()
+    call_command('rebuild_result_tallies', survey.pk, stdout=out)
+    assert 'Rebuilt result tallies of 1 surveys, 1 were wrong' in out.getvalue()
+    schema = get_survey_schemas([survey.pk])[survey.pk]
+    assert live_results(schema) == compute_results(schema)
+
+    OptionTally.objects.update(count=0)
+    SurveyTally.objects.update(count=10)
+    call_command('rebuild_result_tallies', stdout=StringIO())
+    assert SurveyTally.objects.get(survey=survey).count == 4
+    out = StringIO()
+    call_command('rebuild_result_tallies', '--verify', stdout=out)
+    assert 'Verified result tallies of 1 surveys, 0 were wrong' in out.getvalue()
+
+
+def test_compute_results(tmp_path):
+    surveys = [create_survey(2), create_survey(3)]
+    for survey in surveys:
+        create_survey_responses(survey, 2)
+    expected = {survey.pk: compute_results(get_survey_schemas([survey.pk])[survey.pk]) for survey in surveys}
+
+    out = StringIO()
+    call_command('compute_results', '--workers=1', '--chunk-size=1', stdout=out)
+    assert 'Computed 1/2 surveys' in out.getvalue()
+    assert 'Computed results of 2 surveys with 1 workers' in out.getvalue()
+    assert dict(SurveyResults.objects.values_list('survey', 'results')) == expected
+
+    call_command('compute_results', surveys[0].pk, '--workers=1', f'--output-dir={tmp_path}', stdout=StringIO())
+    assert json.loads((tmp_path / f'{surveys[0].pk}.json').read_text()) == expected[surveys[0].pk]
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_compute_results_in_worker_processes():
+    surveys = [create_survey(2) for _ in range(5)]
+    for survey in surveys:
+        create_survey_responses(survey, 1)
+    call_command('compute_results', '--workers=2', '--chunk-size=2', stdout=StringIO())
+    assert SurveyResults.objects.count() == 5
+    assert SurveyResults.objects.get(pk=surveys[4].pk).results['respondents'] == 1
@@ -0,0 +1,37 @@
+import pytest
+
+from survey.surveys.models import Survey
+
+from .utils import create_survey
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def surveys():
+    create_survey(1, title='Dev survey', description='Which linters do you use?')
+    create_survey(1, title='Linters survey', description='Choose your favourite tools')
+    create_survey(1, title='Food survey', description='Pizza or pasta')
+
+
+def test_search_by_title_and_description(api_user, surveys):
+    got = api_user.get('/api/v1/surveys/?search=linter')
+    assert [survey['title'] for survey in got['results']] == ['Linters survey', 'Dev survey']
+
+
+def test_search_without_matches(api_user, surveys):
+    got = api_user.get('/api/v1/surveys/?search=cars')
+    assert got['count'] == 0
+
+
+def test_empty_search_lists_all(api_user, surveys):
+    got = api_user.get('/api/v1/surveys/?search=')
+    assert got['count'] == 3
+
+
+def test_search_vector_updated_on_save(api_admin, api_user, surveys):
+    survey = Survey.objects.get(title='Food survey')
+    api_admin.patch(f'/api/v1/surveys/{survey.pk}/', data={'description': 'Favourite burgers'})
+    got = api_user.get('/api/v1/surveys/?search=burger')
+    assert [survey['title'] for survey in got['results']] == ['Food survey']
@@ -0,0 +1,84 @@
+import threading
+
+from django.db import connection
+
+import pytest
+
+from survey.surveys import batching
+from survey.surveys.models import SurveyResponse
+
+from .utils import CustomSurveyResponse, create_survey, get_survey_response_data
+
+
+@pytest.fixture
+def write_behind(settings):
+    settings.SURVEY_RESPONSES_WRITE_BEHIND = True
+    settings.SUBMISSION_BATCH_LINGER = 0
+
+
+def by_question(survey_response):
+    return sorted(survey_response['responses'], key=lambda response: response['question'])
+
+
+@pytest.mark.django_db
+def test_write_behind_response_matches(api_admin, api_user, surv_active, settings):
+    admin_got = api_admin.post('/api/v1/surveys/', data=surv_active)
+    custom_sr = CustomSurveyResponse(admin_got['pk'])
+    saved = api_user.post('/api/v1/survey-responses/', data=custom_sr.get_valid_sr())
+
+    settings.SURVEY_RESPONSES_WRITE_BEHIND = True
+    settings.SUBMISSION_BATCH_LINGER = 0
+    api_user.cookies.clear()
+    written_behind = api_user.post('/api/v1/survey-responses/', data=custom_sr.get_valid_sr())
+
+    assert by_question(written_behind) == by_question(saved)
+    assert by_question(api_admin.get(f'/api/v1/survey-responses/{written_behind["pk"]}/')) == by_question(saved)
+
+
+@pytest.mark.django_db
+def test_write_behind_rejects_retaken_survey(api_user, write_behind):
+    survey = create_survey(2)
+    data = get_survey_response_data(survey)
+    api_user.post('/api/v1/survey-responses/', data=data)
+    got = api_user.post('/api/v1/survey-responses/', data=data, expected_status_code=400)
+    assert got == {'non_field_errors': ['You\'ve already taken survey "A Survey" before']}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_submissions_share_transactions(settings, monkeypatch):
+    settings.SUBMISSION_BATCH_SIZE = 10
+    settings.SUBMISSION_BATCH_LINGER = 1
+    survey = create_survey(3)
+    payloads = [get_survey_response_data(survey) for _ in range(29)]
+    payloads.append(dict(payloads[0]))  # the same user once more
+
+    batch_sizes = []
+    submit_survey_responses = batching.submit_survey_responses
+
+    def count_batches(items):
+        batch_sizes.append(len(items))
+        return submit_survey_responses(items)
+    monkeypatch.setattr(batching, 'submit_survey_responses', count_batches)
+
+    results = [None] * len(payloads)
+    start = threading.Barrier(len(payloads))
+
+    def submit(index):
+        try:
+            start.wait()
+            results[index] = batching.batcher.submit(payloads[index])
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=submit, args=(index,)) for index in range(len(payloads))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert batch_sizes == [10, 10, 10]
+    assert sorted(result['status'] for result in results) == [201] * 29 + [400]
+    for payload, result in zip(payloads, results):
+        if result['status'] == 201:
+            assert SurveyResponse.objects.get(pk=result['pk']).user_id == payload['user_id']
+    assert SurveyResponse.objects.count() == 29
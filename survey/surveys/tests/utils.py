@@ -1,8 +1,17 @@
+import uuid
+from datetime import datetime, timedelta
 from typing import Dict, List, NamedTuple
 
 from django.db.models import Q
+from django.utils import timezone
 
-from survey.surveys.models import Question, ResponseOption
+from survey.surveys.models import (
+	Question,
+	Response,
+	ResponseOption,
+	Survey,
+	SurveyResponse,
+)
 
 
 QID = NamedTuple(
@@ -46,6 +55,63 @@ def get_response_options_ids(survey_pk: int, sel_pk: int, selmult_pk: int) -> 'R
 	return RID(sel_pks, sel_mult_pks)
 
 
+def create_survey(num_questions: int, num_options: int = 3,
+				  title: str = 'A Survey', description: str = '') -> Survey:
+	"""
+	Creates an active survey straight through the ORM with `num_questions`
+	select questions, each having `num_options` response options.
+	"""
+	now = datetime.now(tz=timezone.utc)
+	survey = Survey.objects.create(
+		title=title,
+		description=description,
+		start_date=now,
+		end_date=now + timedelta(days=1),
+	)
+	questions = Question.objects.bulk_create(
+		Question(survey=survey, title=f'Question {i}', question_type=Question.SELECT)
+		for i in range(num_questions)
+	)
+	ResponseOption.objects.bulk_create(
+		ResponseOption(question=question, title=f'Option {i}')
+		for question in questions
+		for i in range(num_options)
+	)
+	return survey
+
+
+def create_survey_responses(survey: Survey, num_survey_responses: int) -> None:
+	"""
+	Answers every question of the survey `num_survey_responses` times,
+	picking the first response option of each question.
+	"""
+	questions = list(survey.questions.prefetch_related('response_options'))
+	for _ in range(num_survey_responses):
+		survey_response = SurveyResponse.objects.create(survey=survey, user_id=str(uuid.uuid4()))
+		responses = Response.objects.bulk_create(
+			Response(question=question) for question in questions
+		)
+		for response, question in zip(responses, questions):
+			response.response_select.add(question.response_options.all()[0])
+		survey_response.responses.add(*responses)
+
+
+def get_survey_response_data(survey: Survey, user_id: str = None) -> Dict:
+	"""
+	Returns a valid survey response submission to the survey created with
+	`create_survey`, picking the first response option of each question.
+	"""
+	questions = survey.questions.prefetch_related('response_options')
+	return {
+		'user_id': user_id or str(uuid.uuid4()),
+		'survey': survey.pk,
+		'responses': [
+			{'question': question.pk, 'response_select': question.response_options.all()[0].pk}
+			for question in questions
+		],
+	}
+
+
 class CustomSurveyResponse:
 	def __init__(self, survey_pk: int) -> None:
 		self.survey_pk = survey_pk
@@ -1,48 +1,231 @@
-from rest_framework import filters, viewsets
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+
+from django_filters.rest_framework import DjangoFilterBackend
+
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response as APIResponse
+from rest_framework.reverse import reverse
+from rest_framework.serializers import ValidationError
 
-from .models import Question, Survey, SurveyResponse
+from .batching import batcher
+from .cache import get_survey_schemas
+from .crosstab import crosstab, is_select_question
+from .exports import export_csv, export_ndjson
+from .filters import ForeignKeyOrderingFilter, ResponseFilter, SurveySearchFilter
+from .idempotency import idempotent
+from .ingestion import enqueue_submission
+from .matrices import pack_answer_matrix, write_answer_matrix
+from .mixins import CachedSurveyMixin, ConditionalGetMixin, StreamingListMixin
+from .models import Question, QueuedSubmission, Response, Survey, SurveyResponse, answers_document
+from .pagination import KeysetPagination, PageNumberOrKeysetPagination
 from .permissions import IsAdminOrReadOnly
+from .renderers import CSVRenderer, NDJSONRenderer
+from .results import live_results
+from .schemas import get_survey_pk, render_answers
 from .serializers import (
 	QuestionSerializer,
+	QueuedSubmissionSerializer,
+	ResponseSearchSerializer,
 	SurveyResponseSerializer,
+	SurveyResponseSubmissionSerializer,
 	SurveySerializer,
 )
 from .services import set_user_id_to_cookie, user_id_get_or_create
+from .submissions import submit_survey_responses
 
 
-class QuestionSerializerViewSet(viewsets.ModelViewSet):
+class QuestionSerializerViewSet(ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
 	serializer_class = QuestionSerializer
 	permission_classes = [IsAdminUser]
-	queryset = Question.objects.all()
-	filter_backends = [filters.OrderingFilter]
+	queryset = Question.objects.with_related()
+	pagination_class = PageNumberOrKeysetPagination
+	filter_backends = [ForeignKeyOrderingFilter]
 	ordering_fields = ['survey']
+	ordering = ['pk']
+
+
+class ResponseViewSet(viewsets.ReadOnlyModelViewSet):
+	serializer_class = ResponseSearchSerializer
+	permission_classes = [IsAdminUser]
+	queryset = Response.objects.select_related('question').prefetch_related('response_select')
+	pagination_class = KeysetPagination
+	filter_backends = [DjangoFilterBackend]
+	filterset_class = ResponseFilter
 
 
-class SurveyResponseViewSet(viewsets.ModelViewSet):
+class SurveyResponseViewSet(StreamingListMixin, viewsets.ModelViewSet):
 	serializer_class = SurveyResponseSerializer
 	permission_classes = [AllowAny]
 	http_method_names = ['get', 'post']
+	pagination_class = PageNumberOrKeysetPagination
 
 	def get_queryset(self):
 		if self.request.auth:
-			return SurveyResponse.objects.all()
+			return SurveyResponse.objects.for_representation()
 		else:
 			user_id = self.request.COOKIES.get('user_id')
-			return SurveyResponse.objects.by_user(user_id)
+			return SurveyResponse.objects.by_user(user_id).for_representation()
 
+	@idempotent
 	def create(self, request, *args, **kwargs):
 		cookie_is_set = user_id_get_or_create(request)
-		response = super().create(request, *args, **kwargs)
+		if settings.SURVEY_RESPONSES_ASYNC:
+			response = self.enqueue(request)
+		elif settings.SURVEY_RESPONSES_WRITE_BEHIND:
+			response = self.write_behind(request)
+		else:
+			response = super().create(request, *args, **kwargs)
 		set_user_id_to_cookie(request.data.get('user_id'), response, cookie_is_set)
 		return response
 
+	def enqueue(self, request):
+		"""
+		Validates the survey response against its survey schema only and
+		queues it for the process_submissions worker. Responds with a receipt.
+		"""
+		submission = enqueue_submission(self._validate_submission(request.data))
+		location = reverse('submissions-detail', kwargs={'receipt': submission.receipt}, request=request)
+		return APIResponse(
+			QueuedSubmissionSerializer(submission).data,
+			status=status.HTTP_202_ACCEPTED,
+			headers={'Location': location},
+		)
+
+	def write_behind(self, request):
+		"""
+		Saves the survey response along with others submitted to this
+		worker at about the same time, in one transaction.
+		"""
+		data = self._validate_submission(request.data)
+		result = batcher.submit(data)
+		if result['status'] != status.HTTP_201_CREATED:
+			raise ValidationError(result['errors'])
+		schema = get_survey_schemas([data['survey']])[data['survey']]
+		return APIResponse(
+			{
+				'pk': result['pk'],
+				'user_id': data['user_id'],
+				'survey': data['survey'],
+				'responses': render_answers(answers_document(data['responses']), schema),
+			},
+			status=status.HTTP_201_CREATED,
+		)
+
+	def _validate_submission(self, data) -> dict:
+		"""Validates a survey response against its survey schema, no queries once cached."""
+		survey_pk = get_survey_pk(data)
+		serializer = SurveyResponseSubmissionSerializer(
+			data=data,
+			context={'schemas': get_survey_schemas([survey_pk] if survey_pk is not None else [])},
+		)
+		serializer.is_valid(raise_exception=True)
+		return serializer.validated_data
+
+	@action(detail=False, methods=['post'])
+	@idempotent
+	def bulk(self, request):
+		"""Takes survey responses queued by offline clients, each with its user_id."""
+		if not isinstance(request.data, list):
+			raise ValidationError('Expected a list of survey responses')
+		if len(request.data) > settings.SURVEY_RESPONSES_BULK_LIMIT:
+			raise ValidationError(
+				f'Submit at most {settings.SURVEY_RESPONSES_BULK_LIMIT} survey responses at once'
+			)
+		return APIResponse({'results': submit_survey_responses(request.data)})
+
+
+class QueuedSubmissionViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+	serializer_class = QueuedSubmissionSerializer
+	permission_classes = [AllowAny]
+	queryset = QueuedSubmission.objects.all()
+	lookup_field = 'receipt'
+
 
-class SurveyViewSet(viewsets.ModelViewSet):
+class SurveyViewSet(ConditionalGetMixin, CachedSurveyMixin, viewsets.ModelViewSet):
 	serializer_class = SurveySerializer
 	permission_classes = [IsAdminOrReadOnly]
+	filter_backends = [SurveySearchFilter]
+	# active surveys leave the list once they end
+	expiry_field = 'end_date'
 
 	def get_queryset(self):
 		if self.request.user.is_staff:
-			return Survey.objects.all()
-		return Survey.objects.get_active_surveys()
+			queryset = Survey.objects.all()
+		else:
+			queryset = Survey.objects.get_active_surveys()
+		# list and retrieve serialize from cache, prefetching only what's missing
+		if self.action in ('list', 'retrieve'):
+			return queryset
+		return queryset.with_questions()
+
+	def perform_create(self, serializer):
+		super().perform_create(serializer)
+		serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+	def perform_update(self, serializer):
+		super().perform_update(serializer)
+		# refetched, as prefetches of the updated instance are discarded
+		serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+	@action(detail=True, permission_classes=[IsAdminUser])
+	def results(self, request, pk=None):
+		"""Option counts and percentages per question, read from the result tallies."""
+		return APIResponse(live_results(self._get_schema(pk)))
+
+	@action(detail=True, permission_classes=[IsAdminUser], renderer_classes=[CSVRenderer, NDJSONRenderer])
+	def export(self, request, pk=None):
+		"""Streams every survey response to the survey as CSV or NDJSON, starting right away."""
+		schema = self._get_schema(pk)
+		if request.accepted_renderer.format == NDJSONRenderer.format:
+			response = StreamingHttpResponse(export_ndjson(schema), content_type=NDJSONRenderer.media_type)
+		else:
+			response = StreamingHttpResponse(export_csv(schema), content_type=CSVRenderer.media_type)
+		filename = f'survey-{schema.pk}.{request.accepted_renderer.format}'
+		response['Content-Disposition'] = f'attachment; filename="{filename}"'
+		return response
+
+	@action(detail=True, permission_classes=[IsAdminUser])
+	def matrix(self, request, pk=None):
+		"""
+		Downloads the respondent x option answer matrix of the survey as .npy
+		files in a zip, built on disk rather than in memory.
+		"""
+		schema = self._get_schema(pk)
+		archive = tempfile.TemporaryFile()
+		with tempfile.TemporaryDirectory() as directory:
+			write_answer_matrix(schema, directory)
+			pack_answer_matrix(directory, archive)
+		archive.seek(0)
+		return FileResponse(
+			archive,
+			as_attachment=True,
+			filename=f'survey-{schema.pk}-answers.npz',
+			content_type='application/zip',
+		)
+
+	@action(detail=True, permission_classes=[IsAdminUser])
+	def crosstab(self, request, pk=None):
+		"""Contingency table of two select [multiple] questions of the survey, `?q1=` by `?q2=`."""
+		schema = self._get_schema(pk)
+		errors, questions = {}, []
+		for param in ('q1', 'q2'):
+			value = request.query_params.get(param, '')
+			question = schema.questions.get(int(value)) if value.isdigit() else None
+			if question is None or not is_select_question(question):
+				errors[param] = ['Provide a select or select multiple question of the survey']
+			else:
+				questions.append(question.pk)
+		if errors:
+			raise ValidationError(errors)
+		return APIResponse(crosstab(schema, *questions))
+
+	def _get_schema(self, pk: str):
+		if not pk.isdigit() or (schema := get_survey_schemas([int(pk)]).get(int(pk))) is None:
+			raise NotFound
+		return schema
@@ -9,6 +9,8 @@ from rest_framework.routers import DefaultRouter
 
 from .surveys.views import (
     QuestionSerializerViewSet,
+    QueuedSubmissionViewSet,
+    ResponseViewSet,
     SurveyResponseViewSet,
     SurveyViewSet,
 )
@@ -17,6 +19,8 @@ router = DefaultRouter()
 router.register('surveys', SurveyViewSet, 'surveys')
 router.register('survey-responses', SurveyResponseViewSet, 'survey-responses')
 router.register('questions', QuestionSerializerViewSet, 'questions')
+router.register('responses', ResponseViewSet, 'responses')
+router.register('submissions', QueuedSubmissionViewSet, 'submissions')
 
 urlpatterns = [
     path('admin/', admin.site.urls),